@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic inputs for the benchmarks: the same size and seed always give the same bytes."""
+import json
+import os
+import random
+import struct
+
+LIB_DIR = '/usr/lib/x86_64-linux-gnu'
+ARCH = 'amd64'
+# libc6,x86-64 as ldconfig stores it
+LD_FLAGS_X86_64 = 0x0303
+
+# how far ahead (in package order) a generated dependency edge may point
+DEPENDENCY_SPAN = 4
+
+WORDS = [
+    'gd', 'png', 'z', 'fontconfig', 'freetype', 'expat', 'uuid', 'bz2', 'ssl', 'crypto', 'xml', 'curl',
+    'glib', 'gtk', 'pango', 'cairo', 'harfbuzz', 'icu', 'jpeg', 'tiff', 'webp', 'lzma', 'zstd', 'ffi',
+    'pcre', 'selinux', 'acl', 'attr', 'cap', 'gcrypt', 'gpg', 'idn', 'ldap', 'nghttp', 'psl', 'sasl',
+    'sqlite', 'systemd', 'udev', 'dbus', 'x11', 'xcb', 'drm', 'gl', 'egl', 'wayland', 'pulse', 'asound',
+]
+
+def _name(rng, i):
+    return f"{rng.choice(WORDS)}{rng.choice(WORDS)}{i}"
+
+def library_set(size, seed=0):
+    """Return [(package, version, soname, lib_name)] for size synthetic libraries, one per package."""
+    rng = random.Random(seed)
+    libs = []
+    for i in range(size):
+        lib_name = _name(rng, i)
+        major = rng.randint(0, 9)
+        package = f"lib{lib_name}{major}"
+        version = f"{rng.randint(0, 5)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}-{rng.randint(1, 4)}"
+        libs.append((package, version, f"lib{lib_name}.so.{major}", lib_name))
+    return libs
+
+def ld_cache_entries(libs):
+    """(flags, name, path) entries an ldconfig run over the libraries would produce: sonames plus dev links."""
+    entries = []
+    for package, version, soname, lib_name in libs:
+        entries.append((LD_FLAGS_X86_64, soname, f"{LIB_DIR}/{soname}"))
+        entries.append((LD_FLAGS_X86_64, f"lib{lib_name}.so", f"{LIB_DIR}/lib{lib_name}.so"))
+    # ldconfig sorts the cache so that lookups can bisect it; reverse name order is close enough here
+    entries.sort(key=lambda e: e[1], reverse=True)
+    return entries
+
+def write_ld_cache(path, entries):
+    """Write a glibc-ld.so.cache1.1 (new format, little endian) file."""
+    header_size = 48 + 24 * len(entries)
+    strings = bytearray()
+    records = bytearray()
+    for flags, name, lib_path in entries:
+        key = header_size + len(strings)
+        strings += name.encode() + b'\0'
+        value = header_size + len(strings)
+        strings += lib_path.encode() + b'\0'
+        records += struct.pack('<iIIIQ', flags, key, value, 0, 0)
+    header = b'glibc-ld.so.cache1.1' + struct.pack('<IIB3xI12x', len(entries), len(strings), 2, 0)
+    with open(path, 'wb') as f:
+        f.write(header + records + strings)
+
+def ldconfig_p_output(entries):
+    """The text `ldconfig -p` prints for the same entries."""
+    lines = [f"{len(entries)} libs found in cache `/etc/ld.so.cache'"]
+    for _, name, lib_path in entries:
+        lines.append(f"\t{name} (libc6,x86-64) => {lib_path}")
+    return '\n'.join(lines) + '\n'
+
+def write_dpkg_tree(root, libs, files_per_package=20, seed=0):
+    """Write var/lib/dpkg/status and info/*.list under root for the libraries (plus filler files)."""
+    rng = random.Random(seed)
+    admindir = os.path.join(root, 'var/lib/dpkg')
+    info_dir = os.path.join(admindir, 'info')
+    os.makedirs(info_dir, exist_ok=True)
+
+    stanzas = []
+    for package, version, soname, lib_name in libs:
+        source = package.rstrip('0123456789') if rng.random() < 0.5 else package
+        fields = [
+            f"Package: {package}",
+            "Status: install ok installed",
+            "Priority: optional",
+            f"Architecture: {ARCH}",
+            "Multi-Arch: same",
+        ]
+        if source != package:
+            fields.append(f"Source: {source}")
+        fields += [f"Version: {version}", "Description: synthetic library", " for benchmarking"]
+        stanzas.append('\n'.join(fields))
+        paths = ['/.', '/usr', '/usr/lib', LIB_DIR, f"{LIB_DIR}/{soname}", f"{LIB_DIR}/lib{lib_name}.so"]
+        paths += [f"/usr/share/doc/{package}/file{i}" for i in range(files_per_package)]
+        with open(os.path.join(info_dir, f"{package}:{ARCH}.list"), 'w') as f:
+            f.write('\n'.join(paths) + '\n')
+
+    with open(os.path.join(admindir, 'status'), 'w') as f:
+        f.write('\n\n'.join(stanzas) + '\n')
+
+def ldflags(libs, count, seed=0):
+    """An LDFLAGS string naming count of the libraries (and one that does not exist)."""
+    rng = random.Random(seed)
+    chosen = rng.sample(libs, min(count, len(libs)))
+    return ' '.join(['-static'] + [f"-l{lib_name}" for _, _, _, lib_name in chosen] + ['-lmissing'])
+
+def syft_sbom(artifacts, files=None, relationships=None, seed=0):
+    """A syft-JSON-shaped SBOM with artifacts, files and artifactRelationships.
+
+    Package-to-package edges point to one of the next few packages, so they form a DAG with
+    many alternative paths and transitive shortcuts (which show.py drops as redundant); the rest are
+    "contains" edges to random files. A few duplicate packages and files are included since
+    create_graph deduplicates them.
+    """
+    rng = random.Random(seed)
+    files = artifacts if files is None else files
+    relationships = 3 * artifacts if relationships is None else relationships
+
+    packages = []
+    for i in range(artifacts):
+        name = _name(rng, i)
+        packages.append({
+            'id': f"pkg-{i:08x}",
+            'name': name,
+            'version': f"{rng.randint(0, 5)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}",
+            'type': rng.choice(['deb', 'rpm', 'binary']),
+            'foundBy': 'synthetic-cataloger',
+            'locations': [{'path': f"/usr/lib/{name}", 'layerID': 'sha256:0'}],
+            'licenses': [],
+            'cpes': [],
+            'purl': f"pkg:generic/{name}",
+            'metadataType': '',
+            'metadata': {},
+        })
+    for i in range(max(1, artifacts // 50)):
+        duplicate = dict(packages[rng.randrange(artifacts)])
+        duplicate['id'] = f"pkg-dup-{i:08x}"
+        packages.append(duplicate)
+
+    file_entries = []
+    for i in range(files):
+        path = f"/usr/lib/{_name(rng, i)}.so.{rng.randint(0, 9)}"
+        file_entries.append({'id': f"file-{i:08x}", 'location': {'path': path, 'layerID': 'sha256:0'}})
+    for i in range(max(1, files // 50)):
+        duplicate = dict(file_entries[rng.randrange(files)])
+        duplicate['id'] = f"file-dup-{i:08x}"
+        file_entries.append(duplicate)
+
+    edges = []
+    for i in range(relationships):
+        if files and rng.random() < 0.4:
+            parent = packages[rng.randrange(artifacts)]['id']
+            child = file_entries[rng.randrange(files)]['id']
+            edges.append({'parent': parent, 'child': child, 'type': 'contains'})
+        else:
+            # edges only point to the next few packages: acyclic, and with many alternative paths
+            a = rng.randrange(max(1, artifacts - 1))
+            b = min(artifacts - 1, a + rng.randint(1, DEPENDENCY_SPAN))
+            edges.append({'parent': packages[a]['id'], 'child': packages[b]['id'], 'type': 'dependency-of'})
+
+    return {
+        'artifacts': packages,
+        'artifactRelationships': edges,
+        'files': file_entries,
+        'source': {'id': 'synthetic', 'type': 'image'},
+        'distro': {'name': 'debian', 'version': '12'},
+        'descriptor': {'name': 'syft', 'version': 'synthetic'},
+        'schema': {'version': '16.0.0'},
+    }
+
+def package_lists(size, seed=0, prefix=None):
+    """Two "name: version type" lists like `make show` in fedora/ produces, with drift between them.
+
+    Most packages appear in both; some get a version bump, some are renamed slightly
+    (e.g. a soname bump), and some only exist on one side. With prefix, every name starts with
+    it (as python3-*, perl-* or texlive-* do), so all rows share one prefix bucket in diff.py.
+    """
+    rng = random.Random(seed)
+    left = []
+    right = []
+    for i in range(size):
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}{i}"
+        if prefix:
+            name = f"{prefix}-{name}"
+        version = f"{rng.randint(0, 5)}.{rng.randint(0, 30)}-{rng.randint(1, 9)}.fc{rng.choice([41, 42])}"
+        kind = rng.choice(['rpm', 'rpm', 'rpm', 'binary', 'python'])
+        roll = rng.random()
+        if roll < 0.6:
+            left.append(f"{name}: {version} {kind}")
+            right.append(f"{name}: {version} {kind}")
+        elif roll < 0.8:
+            left.append(f"{name}: {version} {kind}")
+            right.append(f"{name}: {version[:-1]}{rng.randint(0, 9)} {kind}")
+        elif roll < 0.9:
+            left.append(f"{name}: {version} {kind}")
+            right.append(f"{name}{rng.randint(1, 9)}: {version} {kind}")
+        elif roll < 0.95:
+            left.append(f"{name}: {version} {kind}")
+        else:
+            right.append(f"{name}: {version} {kind}")
+    return sorted(left), sorted(right)
+
+def write_json(path, value):
+    with open(path, 'w') as f:
+        json.dump(value, f)
+
+def write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Time the repo's hot paths on synthetic inputs and write a JSON report to compare between commits.
+
+Each (benchmark, size) case runs in a fresh interpreter so its peak RSS is its own and a
+runaway case can be stopped by the timeout without losing the rest of the report.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import generators
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEPENDENCIES_DIR = os.path.join(REPO, 'graph', 'dependencies')
+
+SIZE_NAMES = ['small', 'medium', 'large']
+
+# per benchmark: the size parameter for small / medium / large
+BENCHMARKS = {
+    'analyze_libs': [1000, 10000, 50000],
+    'analyze_libs_cached': [1000, 10000, 50000],
+    # names resolved from `ldconfig -p` output, the fallback when ld.so.cache can't be read
+    'analyze_libs_ldconfig': [1000, 10000, 50000],
+    'show.create_graph': [300, 3000, 30000],
+    'show-literal.create_graph': [300, 3000, 30000],
+    'compare_files': [200, 1000, 4000],
+    # every row in one prefix bucket, the worst case for --assignment
+    'compare_files_assignment': [200, 600, 2000],
+}
+
+LDFLAGS_COUNT = 20
+
+def _load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, os.path.dirname(path))
+    spec.loader.exec_module(module)
+    return module
+
+# --- input generation (parent process, not timed) ---
+
+def input_kind(benchmark):
+    """Benchmarks that share inputs (e.g. both create_graph variants) share one generated directory."""
+    if benchmark.startswith('analyze_libs'):
+        return 'analyze_libs'
+    if benchmark.endswith('create_graph'):
+        return 'create_graph'
+    return benchmark
+
+def prepare_inputs(benchmark, size, work_dir):
+    """Generate a case's input files once per size; returns the directory holding them."""
+    kind = input_kind(benchmark)
+    case_dir = os.path.join(work_dir, f"{kind}-{size}")
+    done = os.path.join(case_dir, '.done')
+    if os.path.exists(done):
+        return case_dir
+    os.makedirs(case_dir, exist_ok=True)
+
+    if kind == 'analyze_libs':
+        libs = generators.library_set(size)
+        entries = generators.ld_cache_entries(libs)
+        generators.write_ld_cache(os.path.join(case_dir, 'ld.so.cache'), entries)
+        with open(os.path.join(case_dir, 'ldconfig-p.txt'), 'w') as f:
+            f.write(generators.ldconfig_p_output(entries))
+        generators.write_dpkg_tree(os.path.join(case_dir, 'root'), libs)
+        with open(os.path.join(case_dir, 'ldflags.txt'), 'w') as f:
+            f.write(generators.ldflags(libs, LDFLAGS_COUNT))
+    elif kind == 'create_graph':
+        generators.write_json(os.path.join(case_dir, 'sbom.json'), generators.syft_sbom(size))
+    elif kind in ('compare_files', 'compare_files_assignment'):
+        prefix = 'python3' if kind == 'compare_files_assignment' else None
+        left, right = generators.package_lists(size, prefix=prefix)
+        generators.write_lines(os.path.join(case_dir, 'left.txt'), left)
+        generators.write_lines(os.path.join(case_dir, 'right.txt'), right)
+
+    open(done, 'w').close()
+    return case_dir
+
+# --- case execution (child process) ---
+
+def _ldconfig_shim(case_dir):
+    """A directory holding an `ldconfig` that prints the case's ldconfig-p.txt."""
+    bin_dir = os.path.join(case_dir, 'bin')
+    shim = os.path.join(bin_dir, 'ldconfig')
+    if not os.path.exists(shim):
+        os.makedirs(bin_dir, exist_ok=True)
+        with open(shim, 'w') as f:
+            f.write(f"#!/bin/sh\nexec cat '{os.path.join(case_dir, 'ldconfig-p.txt')}'\n")
+        os.chmod(shim, 0o755)
+    return bin_dir
+
+def case_callable(benchmark, case_dir):
+    """Import the code under test and return a zero-argument function running one iteration."""
+    if benchmark.startswith('analyze_libs'):
+        find_libs = _load_module('find_libs', os.path.join(DEPENDENCIES_DIR, 'find_libs.py'))
+        with open(os.path.join(case_dir, 'ldflags.txt')) as f:
+            flags = f.read()
+        ld_cache_file = os.path.join(case_dir, 'ld.so.cache')
+        root = os.path.join(case_dir, 'root')
+        cache_dir = None
+        if benchmark == 'analyze_libs_ldconfig':
+            # an unreadable cache file sends find_libs to `ldconfig -p`, answered from the generated text
+            ld_cache_file = os.path.join(case_dir, 'missing-ld.so.cache')
+            os.environ['PATH'] = _ldconfig_shim(case_dir) + os.pathsep + os.environ.get('PATH', '')
+        if benchmark == 'analyze_libs_cached':
+            cache_dir = os.path.join(case_dir, 'resolver-cache')
+            # warm the cache outside the timed runs
+            find_libs.analyze_libs(flags, ld_cache_file, cache_dir, db_type='deb', root=root)
+        return lambda: find_libs.analyze_libs(flags, ld_cache_file, cache_dir, db_type='deb', root=root)
+
+    if benchmark.endswith('create_graph'):
+        script = benchmark.split('.')[0] + '.py'
+        show = _load_module(script[:-3].replace('-', '_'), os.path.join(REPO, 'graph', script))
+        sbom_data = show.load_sbom(os.path.join(case_dir, 'sbom.json'))
+        return lambda: show.create_graph(sbom_data)
+
+    if benchmark.startswith('compare_files'):
+        diff = _load_module('diff', os.path.join(REPO, 'fedora', 'diff.py'))
+        with open(os.path.join(case_dir, 'left.txt')) as f:
+            left = [line.strip() for line in f if line.strip()]
+        with open(os.path.join(case_dir, 'right.txt')) as f:
+            right = [line.strip() for line in f if line.strip()]
+        assignment = benchmark == 'compare_files_assignment'
+        return lambda: diff.compare_files(left, right, assignment)
+
+    raise ValueError(f"unknown benchmark: {benchmark}")
+
+def run_case(benchmark, case_dir, repeat):
+    """Run one case in this process and return its measurements."""
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run = case_callable(benchmark, case_dir)
+    except ImportError as e:
+        return {'status': 'skipped', 'error': f"missing dependency: {e}"}
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+    return {
+        'status': 'ok',
+        'seconds': statistics.median(times),
+        'min_seconds': min(times),
+        'runs': times,
+        # ru_maxrss is in KiB on Linux
+        'setup_rss_kb': rss_before,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def spawn_case(benchmark, size, case_dir, repeat, timeout):
+    """Run a case in a fresh interpreter, returning its result (or why it has none)."""
+    command = [sys.executable, os.path.abspath(__file__), '--case', benchmark, '--case-dir', case_dir,
+               '--repeat', str(repeat)]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'error': f"exceeded {timeout}s"}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {'status': 'error', 'error': lines[-1] if lines else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+# --- report ---
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', '-C', REPO, 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_reports(baseline, report):
+    """Print the median time and peak RSS ratio of each case against a baseline report."""
+    previous = {(r['benchmark'], r['size']): r for r in baseline['results']}
+    print(f"{'benchmark':<28} {'size':>7} {'seconds':>10} {'vs base':>8} {'rss MiB':>8} {'vs base':>8}")
+    for result in report['results']:
+        if result['status'] != 'ok':
+            print(f"{result['benchmark']:<28} {result['size']:>7} {result['status']:>10}")
+            continue
+        base = previous.get((result['benchmark'], result['size']))
+        speed = rss = ''
+        if base and base['status'] == 'ok':
+            speed = f"{result['seconds'] / base['seconds']:.2f}x" if base['seconds'] else ''
+            rss = f"{result['peak_rss_kb'] / base['peak_rss_kb']:.2f}x"
+        print(f"{result['benchmark']:<28} {result['size']:>7} {result['seconds']:>10.4f} {speed:>8} "
+              f"{result['peak_rss_kb'] / 1024:>8.1f} {rss:>8}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark find_libs.py, show.py, show-literal.py and fedora/diff.py')
+    parser.add_argument('--benchmark', action='append', choices=sorted(BENCHMARKS),
+                        help='benchmark to run (repeatable; default: all)')
+    parser.add_argument('--size', action='append', choices=SIZE_NAMES, help='input size (repeatable; default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case; the median is reported (default: 3)')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds before a case is abandoned (default: 300)')
+    parser.add_argument('--work-dir', default=os.path.join(REPO, '.bench'),
+                        help='where generated inputs are kept between runs (default: %(default)s)')
+    parser.add_argument('--output', default='bench-report.json', help='report file (default: %(default)s)')
+    parser.add_argument('--compare', metavar='BASELINE', help='print ratios against an earlier report')
+    # internal: run a single case in this process
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--case-dir', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.case_dir, args.repeat)))
+        return
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'results': [],
+    }
+
+    for benchmark in args.benchmark or list(BENCHMARKS):
+        for size_name in args.size or SIZE_NAMES:
+            size = BENCHMARKS[benchmark][SIZE_NAMES.index(size_name)]
+            case_dir = prepare_inputs(benchmark, size, args.work_dir)
+            result = spawn_case(benchmark, size, case_dir, args.repeat, args.timeout)
+            result.update({'benchmark': benchmark, 'size_name': size_name, 'size': size})
+            report['results'].append(result)
+
+            if result['status'] == 'ok':
+                print(f"{benchmark} {size_name} ({size}): {result['seconds']:.4f}s, "
+                      f"peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB", file=sys.stderr)
+            else:
+                print(f"{benchmark} {size_name} ({size}): {result['status']}: {result.get('error', '')}", file=sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
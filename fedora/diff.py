@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 import difflib
-from typing import List, Tuple, Dict
+import heapq
+from collections import Counter, defaultdict
+from typing import List, Tuple, Dict, Optional
 import re
 from dataclasses import dataclass
 from colorama import Fore, Back, Style, init
@@ -95,48 +97,353 @@ def get_prefix(text: str) -> str:
     base = get_package_base(text)  # First get everything before the colon
     return base.split('-')[0] if '-' in base else base
 
-def find_best_match(left: str, right_rows: List[str]) -> Tuple[str, float]:
-    """Find the best matching right row for a given left row."""
-    if not right_rows:
-        return "", 0.0
-
-    # Try exact match first
-    if left in right_rows:
-        return left, 1.0
-
-    # Try matching by prefix before first hyphen
-    left_prefix = get_prefix(left)
-    prefix_matches = []
-    for right in right_rows:
-        right_prefix = get_prefix(right)
-        if left_prefix == right_prefix:
-            # Calculate similarity for sorting but don't filter by threshold
-            similarity = max(calculate_similarity(left, right), similarity_threshold)
-            prefix_matches.append((right, similarity))
-
-    if prefix_matches:
-        # Return the best matching prefix match
-        return max(prefix_matches, key=lambda x: x[1])
-
-    # If no prefix matches, fall back to similarity matching with threshold
-    similarities = [(r, calculate_similarity(left, r)) for r in right_rows]
-    similarities = [(r, s) for r, s in similarities if s >= similarity_threshold]
-
-    if not similarities:
-        return ("", 0.0)
-
-    return max(similarities, key=lambda x: x[1])
-
-def compare_files(left_rows: List[str], right_rows: List[str]) -> List[ComparisonResult]:
-    """Compare rows from two files and generate comparison results."""
+def _is_unscored(text: str) -> bool:
+    """Rows calculate_similarity always scores 0.0."""
+    return not text or text == "(no match)"
+
+def _ratio(matches: int, length: int) -> float:
+    """The same arithmetic as difflib's ratios, so bounds compare exactly against ratio()."""
+    return 2.0 * matches / length if length else 1.0
+
+class CountIndex:
+    """Bases indexed by character counts, which gives every base's quick_ratio bound against a
+    string in one pass over the string's characters."""
+
+    def __init__(self):
+        # (char, k) -> bases with at least k of char
+        self.by_count: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        self.lengths: Dict[int, int] = {}
+        self.empty_base: Optional[int] = None
+
+    def add(self, base_id: int, base: str):
+        self.lengths[base_id] = len(base)
+        if not base:
+            self.empty_base = base_id
+        for char, count in Counter(base).items():
+            for k in range(1, count + 1):
+                self.by_count[(char, k)].append(base_id)
+
+    def bounds(self, text: str) -> List[Tuple[float, int]]:
+        """(-bound, base id) for every base whose quick_ratio bound reaches the threshold, best first."""
+        shared = Counter()
+        for char, count in Counter(text).items():
+            for k in range(1, count + 1):
+                shared.update(self.by_count.get((char, k), ()))
+        if not text and self.empty_base is not None:
+            shared[self.empty_base] = 0
+
+        # shared counts are quick_ratio's matches
+        candidates = []
+        for base_id, matches in shared.items():
+            bound = _ratio(matches, len(text) + self.lengths[base_id])
+            if bound >= similarity_threshold:
+                candidates.append((-bound, base_id))
+        candidates.sort()
+        return candidates
+
+class MatchIndex:
+    """The right rows prepared once for find_best_match.
+
+    Rows are grouped by package base: rows sharing one (e.g. two versions of a package) always
+    score the same, so only the first of them can be picked. Each base keeps a SequenceMatcher
+    with itself as the second sequence, so difflib indexes it once rather than once per left row.
+    Bases are also bucketed by prefix and indexed by character counts (a CountIndex), which gives
+    every base's quick_ratio bound for a left row in one pass and skips full ratios that cannot win.
+    """
+
+    def __init__(self, right_rows: List[str]):
+        self.rows = set(right_rows)
+        self.first_rows: List[str] = []
+        self.unscored: List[bool] = []
+        self.matchers: List[difflib.SequenceMatcher] = []
+        self.by_prefix: Dict[str, List[int]] = defaultdict(list)
+        self.counts = CountIndex()
+        # built on first use, for assign_rows
+        self.prefix_counts: Dict[str, CountIndex] = {}
+
+        self.ids: Dict[Tuple[str, bool], int] = {}
+        for right in right_rows:
+            base = get_package_base(right)
+            key = (base, _is_unscored(right))
+            if key in self.ids:
+                continue
+            base_id = self.ids[key] = len(self.first_rows)
+            self.first_rows.append(right)
+            self.unscored.append(key[1])
+            self.matchers.append(difflib.SequenceMatcher(None, '', base))
+            self.by_prefix[get_prefix(right)].append(base_id)
+            if not key[1]:
+                self.counts.add(base_id, base)
+
+    def base_id(self, right: str) -> int:
+        return self.ids[(get_package_base(right), _is_unscored(right))]
+
+    def _matcher(self, base_id: int, left_base: str) -> difflib.SequenceMatcher:
+        matcher = self.matchers[base_id]
+        matcher.set_seq1(left_base)
+        return matcher
+
+    def ratio(self, base_id: int, left_base: str) -> float:
+        """calculate_similarity of a left row's base against a (scored) base."""
+        return self._matcher(base_id, left_base).ratio()
+
+    def similarity_bounds(self, left_base: str) -> List[Tuple[float, int]]:
+        """(-bound, base id) for every scored base whose quick_ratio bound reaches the threshold, best first."""
+        return self.counts.bounds(left_base)
+
+    def prefix_bounds(self, left_base: str, prefix: str) -> List[Tuple[float, int]]:
+        """similarity_bounds over the scored bases with one prefix only."""
+        counts = self.prefix_counts.get(prefix)
+        if counts is None:
+            counts = self.prefix_counts[prefix] = CountIndex()
+            for base_id in self.by_prefix.get(prefix, ()):
+                if not self.unscored[base_id]:
+                    counts.add(base_id, get_package_base(self.first_rows[base_id]))
+        return counts.bounds(left_base)
+
+    def _best_by_prefix(self, left: str, candidates: List[int]) -> Tuple[str, float]:
+        left_base = get_package_base(left)
+        best, best_similarity = candidates[0], -1.0
+        for base_id in candidates:
+            if _is_unscored(left) or self.unscored[base_id]:
+                similarity = similarity_threshold
+            else:
+                # prefix matches never score under the threshold, so only a higher ratio can win
+                matcher = self._matcher(base_id, left_base)
+                if matcher.real_quick_ratio() <= best_similarity or matcher.quick_ratio() <= best_similarity:
+                    continue
+                similarity = max(matcher.ratio(), similarity_threshold)
+            if similarity > best_similarity:
+                best, best_similarity = base_id, similarity
+        return self.first_rows[best], best_similarity
+
+    def _best_by_similarity(self, left: str) -> Tuple[str, float]:
+        if _is_unscored(left):
+            return ("", 0.0)
+        left_base = get_package_base(left)
+        best, best_similarity = None, similarity_threshold
+        # try the highest bounds first and stop once none can win
+        for negative_bound, base_id in self.similarity_bounds(left_base):
+            if best is not None and (-negative_bound < best_similarity
+                                     or (-negative_bound == best_similarity and base_id > best)):
+                break
+            similarity = self.ratio(base_id, left_base)
+            if best is None:
+                if similarity >= similarity_threshold:
+                    best, best_similarity = base_id, similarity
+            elif similarity > best_similarity or (similarity == best_similarity and base_id < best):
+                best, best_similarity = base_id, similarity
+        if best is None:
+            return ("", 0.0)
+        return self.first_rows[best], best_similarity
+
+    def best_match(self, left: str) -> Tuple[str, float]:
+        if not self.first_rows:
+            return "", 0.0
+        if left in self.rows:
+            return left, 1.0
+        candidates = self.by_prefix.get(get_prefix(left))
+        if candidates:
+            return self._best_by_prefix(left, candidates)
+        return self._best_by_similarity(left)
+
+def find_best_match(left: str, right_rows: List[str], index: Optional[MatchIndex] = None) -> Tuple[str, float]:
+    """Find the best matching right row for a given left row.
+
+    An exact match wins, then the most similar row with the same prefix, then the most similar
+    row overall if it reaches similarity_threshold (the first such row on ties). Pass a MatchIndex
+    of right_rows when matching many left rows against the same list.
+    """
+    if index is None:
+        index = MatchIndex(right_rows)
+    return index.best_match(left)
+
+def _assign(candidates: Dict[int, List[Tuple[int, float]]], weight) -> Dict[int, Tuple[int, float]]:
+    """{left: (right, weight)} pairs with the largest total weight, using only candidate pairs.
+
+    candidates maps each left to its (right, bound) pairs, bound being at least weight(left, right);
+    weight returns None for a pair that may not be made. This is the Hungarian algorithm in its
+    sparse form: lefts are added one at a time along the shortest augmenting path (Dijkstra over
+    reduced costs), where leaving a left unpaired is always a path of weight 0. Only rights reachable
+    through candidates are visited, and a pair is weighed only once the search reaches it on its
+    bound, so most candidates are never scored in full.
+    """
+    inf = float('inf')
+    weights: Dict[Tuple[int, int], Optional[float]] = {}
+    # potentials; a left's own "unpaired" column is -1 - left, so it cannot clash with a right
+    u: Dict[int, float] = defaultdict(float)
+    v: Dict[int, float] = defaultdict(float)
+    owner: Dict[int, int] = {}
+
+    for start in sorted(candidates):
+        dist: Dict[int, float] = {}
+        way: Dict[int, Optional[int]] = {}
+        taken: Dict[int, None] = {}
+        # (distance, or a lower bound of it while the pair is unweighed, column, left, the left's
+        # distance, the column the left was reached through, whether the distance is exact)
+        heap = []
+
+        def push(column: int, cost: float, left: int, base: float, came_from: Optional[int], exact: bool):
+            # a taken column is final; rounding can make a later path look a hair shorter
+            if column not in taken and cost < dist.get(column, inf):
+                if exact:
+                    dist[column], way[column] = cost, came_from
+                heapq.heappush(heap, (cost, column, left, base, came_from, exact))
+
+        def relax(left: int, base: float, came_from: Optional[int]):
+            push(-1 - left, base - u[left] - v[-1 - left], left, base, came_from, True)
+            for column, bound in candidates[left]:
+                known = (left, column) in weights
+                if known and weights[(left, column)] is None:
+                    continue
+                pair_weight = weights[(left, column)] if known else bound
+                push(column, base - pair_weight - u[left] - v[column], left, base, came_from, known)
+
+        relax(start, 0.0, None)
+        while True:
+            cost, column, left, base, came_from, exact = heapq.heappop(heap)
+            if column in taken:
+                continue
+            if not exact:
+                if (left, column) not in weights:
+                    weights[(left, column)] = weight(left, column)
+                if weights[(left, column)] is not None:
+                    push(column, base - weights[(left, column)] - u[left] - v[column], left, base, came_from, True)
+                continue
+            if cost > dist[column]:
+                continue
+            if column not in owner:
+                end = column
+                break
+            taken[column] = None
+            relax(owner[column], cost, column)
+
+        # distances are final for every column taken; shift potentials so the path becomes tight
+        total = dist[end]
+        u[start] += total
+        for column in taken:
+            u[owner[column]] += total - dist[column]
+            v[column] -= total - dist[column]
+        column = end
+        while column is not None:
+            previous = way[column]
+            owner[column] = owner[previous] if previous is not None else start
+            column = previous
+
+    return {left: (right, weights[(left, right)]) for right, left in owner.items() if right >= 0}
+
+def assign_rows(left_rows: List[str], right_rows: List[str],
+                index: Optional[MatchIndex] = None) -> Dict[int, Tuple[int, float]]:
+    """Pair left and right rows one-to-one, maximizing the total similarity.
+
+    Returns {left position: (right position, similarity)}. Similarities are scored as in
+    find_best_match: identical rows are paired first, rows sharing a prefix always count at least
+    similarity_threshold, and rows left over after each prefix has been paired can still pair
+    across prefixes when their similarity reaches the threshold.
+
+    Every pairing within a prefix counts the threshold once per pair, so the best one is the
+    pairing that rises furthest above it, topped up with the remaining rows at the threshold. Only
+    pairs whose quick_ratio bound beats the threshold take part in that assignment.
+    """
+    if index is None:
+        index = MatchIndex(right_rows)
+    pairs: Dict[int, Tuple[int, float]] = {}
+    paired_rights = set()
+
+    waiting = defaultdict(list)
+    for j in reversed(range(len(right_rows))):
+        waiting[right_rows[j]].append(j)
+    for i, left in enumerate(left_rows):
+        if waiting.get(left):
+            j = waiting[left].pop()
+            pairs[i] = (j, 1.0)
+            paired_rights.add(j)
+
+    def similarity(i: int, j: int) -> float:
+        return index.ratio(index.base_id(right_rows[j]), get_package_base(left_rows[i]))
+
+    def candidates(lefts: List[int], rights: List[int], bounds) -> Dict[int, List[Tuple[int, float]]]:
+        """left -> [(right, quick_ratio bound)] among lefts and rights, for bounds reaching the threshold."""
+        rights_by_base = defaultdict(list)
+        for j in rights:
+            if not _is_unscored(right_rows[j]):
+                rights_by_base[index.base_id(right_rows[j])].append(j)
+        found = {}
+        for i in lefts:
+            if _is_unscored(left_rows[i]):
+                continue
+            row = [(j, -negative_bound) for negative_bound, base_id in bounds(get_package_base(left_rows[i]))
+                   for j in rights_by_base.get(base_id, ())]
+            if row:
+                found[i] = row
+        return found
+
+    def above_threshold(i: int, j: int) -> Optional[float]:
+        excess = similarity(i, j) - similarity_threshold
+        return excess if excess > 0.0 else None
+
+    buckets = defaultdict(lambda: ([], []))
+    for i, left in enumerate(left_rows):
+        if i not in pairs:
+            buckets[get_prefix(left)][0].append(i)
+    for j, right in enumerate(right_rows):
+        if j not in paired_rights:
+            buckets[get_prefix(right)][1].append(j)
+    for prefix, (lefts, rights) in buckets.items():
+        if not lefts or not rights:
+            continue
+        found = candidates(lefts, rights, lambda left_base: index.prefix_bounds(left_base, prefix))
+        # weighed by how far each pair rises above the threshold, which a pair bounded at it cannot
+        excess = {i: [(j, bound - similarity_threshold) for j, bound in row if bound > similarity_threshold]
+                  for i, row in found.items()}
+        for i, (j, _) in _assign({i: row for i, row in excess.items() if row}, above_threshold).items():
+            pairs[i] = (j, similarity(i, j))
+            paired_rights.add(j)
+        rest = [j for j in rights if j not in paired_rights]
+        for i, j in zip([i for i in lefts if i not in pairs], rest):
+            pairs[i] = (j, similarity_threshold)
+            paired_rights.add(j)
+
+    def reaching_threshold(i: int, j: int) -> Optional[float]:
+        ratio = similarity(i, j)
+        return ratio if ratio >= similarity_threshold else None
+
+    # what is left can only pair across prefixes
+    lefts = [i for i in range(len(left_rows)) if i not in pairs]
+    rights = [j for j in range(len(right_rows)) if j not in paired_rights]
+    for i, (j, ratio) in _assign(candidates(lefts, rights, index.similarity_bounds), reaching_threshold).items():
+        pairs[i] = (j, ratio)
+    return pairs
+
+def compare_files(left_rows: List[str], right_rows: List[str], assignment: bool = False) -> List[ComparisonResult]:
+    """Compare rows from two files and generate comparison results.
+
+    By default each left row takes its best match, even one another left row took too; with
+    assignment rows are paired one-to-one (see assign_rows).
+    """
     results = []
     used_right_rows = set()
+    index = MatchIndex(right_rows)
 
     # Sort left rows
     left_rows = sorted(left_rows)
 
+    if assignment:
+        pairs = assign_rows(left_rows, right_rows, index)
+        for i, left in enumerate(left_rows):
+            if i in pairs:
+                j, similarity = pairs[i]
+                results.append(ComparisonResult(left, right_rows[j], similarity, color_diff(left, right_rows[j])))
+            else:
+                results.append(ComparisonResult(left, no_match, 0.0, color_diff(left, "")))
+        paired_rights = {j for j, _ in pairs.values()}
+        for j, right in enumerate(right_rows):
+            if j not in paired_rights:
+                results.append(ComparisonResult(no_match, right, 0.0, color_diff("", right)))
+        return results
+
     for left in left_rows:
-        best_right, similarity = find_best_match(left, right_rows)
+        best_right, similarity = find_best_match(left, right_rows, index)
         if similarity >= similarity_threshold:
             used_right_rows.add(best_right)
             colored = color_diff(left, best_right)
@@ -182,6 +489,9 @@ def main():
     parser = argparse.ArgumentParser(description='Compare two files and show differences')
     parser.add_argument('file1', help='First file path')
     parser.add_argument('file2', help='Second file path')
+    parser.add_argument('--assignment', action='store_true',
+                        help='pair rows one-to-one for the highest total similarity, instead of giving each '
+                             'row of file1 its best match whether or not another row took it')
     args = parser.parse_args()
 
     try:
@@ -192,7 +502,7 @@ def main():
         print(f"Error: {e}")
         return
 
-    results = compare_files(left_rows, right_rows)
+    results = compare_files(left_rows, right_rows, args.assignment)
     print(format_table(results))
 
 if __name__ == "__main__":
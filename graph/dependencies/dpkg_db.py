@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+import os
+
+from pkgdb import ANY_ARCH, OwnershipIndex, canonical_path, root_aliases
+
+DB_TYPE = 'deb'
+DPKG_ADMINDIR = 'var/lib/dpkg'
+
+def _package_from_list_name(list_file):
+    # "libc6:amd64.list" -> ("libc6", "amd64"), "zlib1g-dev.list" -> ("zlib1g-dev", ANY_ARCH), as dpkg -S names them
+    name, _, arch = list_file[:-len('.list')].partition(':')
+    return name, arch or ANY_ARCH
+
+def _read_lists(index, info_dir):
+    """Index every path in the per-package .list files."""
+    try:
+        list_files = sorted(f for f in os.listdir(info_dir) if f.endswith('.list'))
+    except OSError:
+        return
+
+    for list_file in list_files:
+        package = _package_from_list_name(list_file)
+        with open(os.path.join(info_dir, list_file), 'r', encoding='utf-8', errors='surrogateescape') as f:
+            for line in f:
+                path = line.rstrip('\n')
+                if path and path != '/.':
+                    index.add(path, package)
+
+def _read_diversions(index, diversions_file):
+    """Apply dpkg diversions: the diverted-to path holds the original owner's content."""
+    try:
+        with open(diversions_file, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return
+
+    # the file is a sequence of (from, to, diverting package) triples
+    for i in range(0, len(lines) - 2, 3):
+        divert_from, divert_to, holder = lines[i], lines[i + 1], lines[i + 2]
+        owner = index.lookup(divert_from)
+        if owner and owner[0] != holder:
+            index.owners[divert_to] = owner
+            canonical = canonical_path(divert_to, index.aliases)
+            index.owners[canonical] = owner
+
+def _read_alternatives(index, alternatives_dir, root):
+    """Attribute alternatives links to the package owning the currently selected target."""
+    try:
+        names = os.listdir(alternatives_dir)
+    except OSError:
+        return
+
+    for name in names:
+        try:
+            with open(os.path.join(alternatives_dir, name), 'r', encoding='utf-8', errors='surrogateescape') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        if len(lines) < 2:
+            continue
+
+        # line 0 is the mode, line 1 the master link, then (slave name, slave link) pairs up to a blank line
+        links = [(name, lines[1])]
+        i = 2
+        while i + 1 < len(lines) and lines[i]:
+            links.append((lines[i], lines[i + 1]))
+            i += 2
+
+        for link_name, link in links:
+            selection = os.path.join('/etc/alternatives', link_name)
+            try:
+                target = os.readlink(os.path.join(root, selection.lstrip('/')))
+            except OSError:
+                continue
+            target = os.path.normpath(os.path.join('/etc/alternatives', target))
+            owner = index.lookup(target) or index.lookup_canonical(target)
+            if owner:
+                index.add(link, owner)
+                index.add(selection, owner)
+
+def load_ownership_index(root='/'):
+    """Build the file ownership index from the dpkg database under the given root."""
+    admindir = os.path.join(root, DPKG_ADMINDIR)
+    index = OwnershipIndex(aliases=root_aliases(root))
+
+    _read_lists(index, os.path.join(admindir, 'info'))
+    _read_diversions(index, os.path.join(admindir, 'diversions'))
+    _read_alternatives(index, os.path.join(admindir, 'alternatives'), root)
+
+    return index
+
+STATUS_FIELDS = {'Package', 'Status', 'Version', 'Architecture', 'Source', 'Multi-Arch'}
+
+def _add_package(table, fields):
+    """Fold one status stanza into the package table."""
+    package = fields.get('Package')
+    version = fields.get('Version')
+    status = fields.get('Status', '')
+    if not package or not version or status.endswith(' not-installed'):
+        return
+
+    # Multi-Arch: same packages can be installed once per architecture, and only those are
+    # arch-qualified in dpkg's own names (libfoo1:i386.list); the rest are keyed under ANY_ARCH
+    architecture = fields.get('Architecture', '')
+    multi_arch = fields.get('Multi-Arch', 'no')
+    key = (package, architecture if multi_arch == 'same' else ANY_ARCH)
+
+    # preferring a fully installed stanza when one package appears more than once
+    installed = status.endswith(' installed')
+    existing = table.get(key)
+    if existing and (existing['installed'] or not installed):
+        return
+
+    # "Source: glibc (2.35-0ubuntu3)" carries a source version only when it differs from the binary
+    source, _, source_version = fields.get('Source', package).partition(' ')
+    source_version = source_version.strip('()') or version
+
+    table[key] = {
+        'version': version,
+        'architecture': architecture,
+        'source': source,
+        'source_version': source_version,
+        'multi_arch': multi_arch,
+        'installed': installed,
+    }
+
+def load_package_table(root='/'):
+    """Stream the dpkg status file once into a (package, arch) -> version/arch/source table."""
+    status_file = os.path.join(root, DPKG_ADMINDIR, 'status')
+    table = {}
+    fields = {}
+    try:
+        with open(status_file, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            for line in f:
+                if line == '\n':
+                    _add_package(table, fields)
+                    fields = {}
+                    continue
+                # continuation lines only belong to fields we don't keep (Description, Conffiles, ...)
+                if line[0] in ' \t':
+                    continue
+                key, _, value = line.partition(':')
+                if key in STATUS_FIELDS:
+                    fields[key] = value.strip()
+    except OSError:
+        return table
+
+    _add_package(table, fields)
+    return table
+
+def database_present(root='/'):
+    """Whether root has a dpkg database."""
+    return os.path.isfile(os.path.join(root, DPKG_ADMINDIR, 'status'))
+
+def database_inputs(root='/'):
+    """Files whose change invalidates indexes built from this database: (stat only, content hashed)."""
+    admindir = os.path.join(root, DPKG_ADMINDIR)
+    status_file = os.path.join(admindir, 'status')
+    stat_only = [
+        status_file,
+        os.path.join(admindir, 'info'),
+        os.path.join(admindir, 'diversions'),
+        os.path.join(admindir, 'alternatives'),
+        os.path.join(root, 'etc/alternatives'),
+    ]
+    return stat_only, [status_file]
+
+def load_database(root='/'):
+    """Load the (ownership index, package table) pair for this backend."""
+    return load_ownership_index(root), load_package_table(root)
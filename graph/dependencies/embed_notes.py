@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+import zlib
+
+import incremental
+from make_notes import decode_notes, is_compressed
+from resolver_cache import default_cache_dir
+
+NOTE_SECTION = '.note.package'
+
+ELF_MAGIC = b'\x7fELF'
+ENDIAN_PREFIX = {1: '<', 2: '>'}
+
+SHT_STRTAB = 3
+SHT_NOTE = 7
+SHT_NOBITS = 8
+SHF_ALLOC = 0x2
+SHN_UNDEF = 0
+SHN_LORESERVE = 0xff00
+SHN_XINDEX = 0xffff
+
+# the systemd package metadata note (https://systemd.io/ELF_PACKAGE_METADATA/), for --note-format elf
+FDO_NOTE_NAME = b'FDO\0'
+FDO_NOTE_TYPE = 0xcafe1a7e
+# our own extension: the same metadata as zlib-compressed compact JSON (make_notes.py --compress)
+FDO_NOTE_TYPE_ZLIB = 0xcafe1a7f
+NOTE_TYPES = (FDO_NOTE_TYPE, FDO_NOTE_TYPE_ZLIB)
+# bump when embedding the same notes can write a different file
+EMBED_FORMAT = 1
+# bytes of other non-loaded sections at the end of the file that are copied along to reuse the space they share
+RECLAIM_CARRY_BYTES = 64 * 1024
+
+# per EI_CLASS: where e_shoff lives, where e_shentsize/e_shnum/e_shstrndx start, the section header layout,
+# and the same for the program headers (plus which fields of one hold p_offset and p_filesz)
+ELF_LAYOUTS = {
+    1: {'shoff': (0x20, 'I'), 'shcounts': 0x2e, 'shdr': 'IIIIIIIIII', 'align': 4,
+        'phoff': (0x1c, 'I'), 'phcounts': 0x2a, 'phdr': ('IIIIIIII', 1, 4)},
+    2: {'shoff': (0x28, 'Q'), 'shcounts': 0x3a, 'shdr': 'IIQQQQIIQQ', 'align': 8,
+        'phoff': (0x20, 'Q'), 'phcounts': 0x36, 'phdr': ('IIQQQQQQ', 2, 5)},
+}
+
+# indexes into an unpacked section header
+SH_NAME, SH_TYPE, SH_FLAGS, SH_ADDR, SH_OFFSET, SH_SIZE, SH_LINK, SH_INFO, SH_ADDRALIGN, SH_ENTSIZE = range(10)
+
+class ElfError(Exception):
+    """Raised when a file is not an ELF object this module can patch."""
+
+def _align(value, alignment):
+    return (value + alignment - 1) // alignment * alignment
+
+def _unpack(fmt, data, offset):
+    # slicing rather than unpack_from, so data can be anything sliceable (an mmap, or a stream view)
+    return struct.unpack(fmt, data[offset:offset + struct.calcsize(fmt)])
+
+def read_elf(data):
+    """Parse the ELF header and section header table from a sliceable object (e.g. an mmap)."""
+    ident = data[:16]
+    if ident[:4] != ELF_MAGIC:
+        raise ElfError("not an ELF file")
+    if len(ident) < 16:
+        raise ElfError("truncated ELF identification")
+    layout = ELF_LAYOUTS.get(ident[4])
+    endian = ENDIAN_PREFIX.get(ident[5])
+    if layout is None or endian is None:
+        raise ElfError(f"unsupported ELF class/data: {ident[4]}/{ident[5]}")
+
+    try:
+        offset, fmt = layout['shoff']
+        shoff, = _unpack(endian + fmt, data, offset)
+        shentsize, shnum, shstrndx = _unpack(endian + 'HHH', data, layout['shcounts'])
+        shdr = endian + layout['shdr']
+
+        sections = []
+        if shoff:
+            if shentsize != struct.calcsize(shdr):
+                raise ElfError(f"unexpected section header size: {shentsize}")
+            # with 0xff00 or more sections the real count and string table index live in section 0
+            first = _unpack(shdr, data, shoff)
+            if shnum == 0:
+                shnum = first[SH_SIZE]
+            if shstrndx == SHN_XINDEX:
+                shstrndx = first[SH_LINK]
+            table = data[shoff:shoff + shnum * shentsize]
+            sections = [list(header) for header in struct.iter_unpack(shdr, table)]
+            if len(sections) != shnum:
+                raise ElfError("truncated section header table")
+    except struct.error as e:
+        raise ElfError(f"truncated ELF headers: {e}")
+
+    names = []
+    strtab = b''
+    if sections and shstrndx < len(sections):
+        strtab_header = sections[shstrndx]
+        strtab = bytes(data[strtab_header[SH_OFFSET]:strtab_header[SH_OFFSET] + strtab_header[SH_SIZE]])
+        for section in sections:
+            end = strtab.find(b'\0', section[SH_NAME])
+            names.append(os.fsdecode(strtab[section[SH_NAME]:end if end >= 0 else None]))
+
+    return {
+        'endian': endian,
+        'layout': layout,
+        'shoff': shoff,
+        'shstrndx': shstrndx,
+        'sections': sections,
+        'names': names,
+        'strtab': strtab,
+    }
+
+def section_data(data, elf, name=NOTE_SECTION):
+    """Return the raw contents of the named section, or None when the file has no such section."""
+    for section, section_name in zip(elf['sections'], elf['names']):
+        if section_name == name:
+            return bytes(data[section[SH_OFFSET]:section[SH_OFFSET] + section[SH_SIZE]])
+    return None
+
+def build_note(payload, endian, note_format='raw', compressed=False):
+    """Section contents for a payload: the bytes as-is (what objcopy --add-section writes) or an FDO ELF note."""
+    if note_format == 'raw':
+        if compressed:
+            raise ElfError("compressed notes need an ELF note to carry their type (--note-format elf)")
+        return payload, 1
+    # JSON descriptors are NUL-terminated per the spec; a compressed one is kept byte-exact
+    desc = payload if compressed else payload + b'\0'
+    note_type = FDO_NOTE_TYPE_ZLIB if compressed else FDO_NOTE_TYPE
+    header = struct.pack(endian + 'III', len(FDO_NOTE_NAME), len(desc), note_type)
+    padded_desc = desc + b'\0' * (_align(len(desc), 4) - len(desc))
+    return header + FDO_NOTE_NAME + padded_desc, 4
+
+def note_payload(contents, endian):
+    """Return (payload, compressed) for a note section, unwrapping an FDO ELF note when that is what it holds.
+
+    compressed is None for a raw section, where only the payload itself can tell.
+    """
+    if len(contents) >= 16 and contents[12:16] == FDO_NOTE_NAME:
+        namesz, descsz, note_type = struct.unpack_from(endian + 'III', contents, 0)
+        if namesz == len(FDO_NOTE_NAME) and note_type in NOTE_TYPES:
+            desc = contents[16:16 + descsz]
+            if note_type == FDO_NOTE_TYPE_ZLIB:
+                return desc, True
+            return desc.rstrip(b'\0'), False
+    return contents, None
+
+def embed_note(path, payload, section=NOTE_SECTION, note_format='raw', compressed=False):
+    """Add (or replace) a non-loaded note section in an ELF file, in place.
+
+    The note, a grown section name table and a new section header table are appended to
+    the end of the file, and only then is the ELF header pointed at them. Nothing already
+    in the file moves, so an interrupted run leaves the original binary intact (plus some
+    trailing bytes), and patching a large binary writes kilobytes instead of copying it.
+
+    When those blocks from an earlier embed already end the file, the new ones are laid over
+    them instead (after a complete copy has been staged past them), so embedding again does
+    not grow the file.
+    """
+    with open(path, 'r+b') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ElfError("empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            elf = read_elf(data)
+
+        endian = elf['endian']
+        layout = elf['layout']
+        sections = [list(s) for s in elf['sections']]
+        shstrndx = elf['shstrndx']
+        strtab = elf['strtab']
+        if not sections:
+            # a stripped file with no section headers: start from the null section and a name table
+            sections = [[0] * 10, [1, SHT_STRTAB, 0, 0, 0, 0, 0, 0, 1, 0]]
+            shstrndx = 1
+            strtab = b'\0.shstrtab\0'
+        elif shstrndx == SHN_UNDEF or shstrndx >= len(sections):
+            # section headers without a name table: add one (the existing sections stay unnamed)
+            for header in sections:
+                header[SH_NAME] = 0
+            sections.append([1, SHT_STRTAB, 0, 0, 0, 0, 0, 0, 1, 0])
+            shstrndx = len(sections) - 1
+            strtab = b'\0.shstrtab\0'
+
+        contents, note_align = build_note(payload, endian, note_format, compressed)
+        note_index = elf['names'].index(section) if section in elf['names'] else None
+        if note_index is None:
+            # a new section: its name goes at the end of the name table, which then has to be rewritten
+            note_index = len(sections)
+            sections.append([len(strtab), SHT_NOTE, 0, 0, 0, 0, 0, 0, note_align, 0])
+            strtab += os.fsencode(section) + b'\0'
+            new_strtab = True
+        else:
+            new_strtab = False
+
+        # blocks an earlier embed left at the end of the file can be overwritten rather than appended to
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            cut, carried = _reclaimable_tail(data, elf, size, {shstrndx, note_index})
+            carried = {index: bytes(data[sections[index][SH_OFFSET]:sections[index][SH_OFFSET] + sections[index][SH_SIZE]])
+                       for index in carried}
+        parts = (sections, shstrndx, strtab, note_index, contents, note_align, layout, endian)
+
+        if cut == size:
+            note_offset, tail, headers = _build_tail(*parts, size, new_strtab, {})
+            _write_tail(f, size, tail, layout, endian, headers)
+            return {'offset': note_offset, 'size': len(contents), 'appended': len(tail)}
+
+        # the final blocks go where the old ones start; a complete first copy (carried sections
+        # included) is written past both them and the final blocks' end, so the ELF header always
+        # points at intact headers and contents if interrupted
+        moved = new_strtab or sections[shstrndx][SH_OFFSET] >= cut
+        note_offset, tail, headers = _build_tail(*parts, cut, moved, carried)
+        staging = _align(max(size, cut + len(tail)), 8)
+        _, staged_tail, staged_headers = _build_tail(*parts, staging, moved, carried)
+        _write_tail(f, staging, staged_tail, layout, endian, staged_headers)
+        _write_tail(f, cut, tail, layout, endian, headers)
+        f.truncate(cut + len(tail))
+
+    return {'offset': note_offset, 'size': len(contents), 'appended': cut + len(tail) - size}
+
+def _reclaimable_tail(data, elf, size, rewritten):
+    """(start, carried) of the blocks at the end of the file that embed_note may rewrite.
+
+    Those are the section header table and non-loaded sections: the ones in rewritten (the name
+    table and the note) and, up to RECLAIM_CARRY_BYTES, others that are copied along (carried),
+    such as another note an earlier embed added. They only count when they run back-to-back (up
+    to alignment padding) to the end of the file and nothing else the ELF headers describe
+    (sections, segments, program headers) lies after them, so data appended by other tools is
+    never cut off. start is size when there is nothing to reclaim.
+    """
+    sections = elf['sections']
+    layout = elf['layout']
+    endian = elf['endian']
+    if not sections or elf['shstrndx'] == SHN_UNDEF or elf['shstrndx'] >= len(sections):
+        return size, []
+    shdr_size = struct.calcsize(endian + layout['shdr'])
+    blocks = [(elf['shoff'], elf['shoff'] + len(sections) * shdr_size, None)]
+    for index, header in enumerate(sections):
+        if index and header[SH_SIZE] and header[SH_TYPE] != SHT_NOBITS and not header[SH_FLAGS] & SHF_ALLOC:
+            blocks.append((header[SH_OFFSET], header[SH_OFFSET] + header[SH_SIZE], index))
+
+    cut = size
+    movable = set()
+    carried = []
+    carried_bytes = 0
+    for start, end, index in sorted(blocks, reverse=True):
+        if end > cut or cut - end >= layout['align']:
+            break
+        if index is not None and index not in rewritten:
+            if carried_bytes + end - start > RECLAIM_CARRY_BYTES:
+                break
+            carried_bytes += end - start
+            carried.append(index)
+        movable.add(index)
+        cut = start
+    if cut == size:
+        return size, []
+
+    for index, header in enumerate(sections):
+        if index not in movable and header[SH_TYPE] != SHT_NOBITS and header[SH_OFFSET] + header[SH_SIZE] > cut:
+            return size, []
+    offset, fmt = layout['phoff']
+    phoff, = _unpack(endian + fmt, data, offset)
+    phentsize, phnum = _unpack(endian + 'HH', data, layout['phcounts'])
+    if phnum and phoff + phnum * phentsize > cut:
+        return size, []
+    phdr, offset_field, filesz_field = layout['phdr']
+    for index in range(phnum):
+        segment = _unpack(endian + phdr, data, phoff + index * phentsize)
+        if segment[filesz_field] and segment[offset_field] + segment[filesz_field] > cut:
+            return size, []
+    return cut, carried
+
+def _build_tail(sections, shstrndx, strtab, note_index, contents, note_align, layout, endian, base, write_strtab,
+                carried):
+    """The bytes to write at base (carried sections, the note, the name table when write_strtab, the
+    section headers), returned as (note offset, tail, (shoff, e_shnum, e_shstrndx)) for that placement."""
+    sections = [list(header) for header in sections]
+    tail = bytearray()
+    for index, section_contents in sorted(carried.items()):
+        offset = _align(base + len(tail), max(sections[index][SH_ADDRALIGN], 1))
+        tail += b'\0' * (offset - base - len(tail))
+        sections[index][SH_OFFSET] = offset
+        tail += section_contents
+
+    note_offset = _align(base + len(tail), note_align)
+    tail += b'\0' * (note_offset - base - len(tail))
+    tail += contents
+    note = sections[note_index]
+    note[SH_OFFSET] = note_offset
+    note[SH_SIZE] = len(contents)
+    note[SH_ADDRALIGN] = note_align
+    if write_strtab:
+        sections[shstrndx][SH_OFFSET] = base + len(tail)
+        sections[shstrndx][SH_SIZE] = len(strtab)
+        tail += strtab
+
+    shnum = len(sections)
+    header_shnum, header_shstrndx = shnum, shstrndx
+    if shnum >= SHN_LORESERVE:
+        sections[0][SH_SIZE] = shnum
+        header_shnum = 0
+    if shstrndx >= SHN_LORESERVE:
+        sections[0][SH_LINK] = shstrndx
+        header_shstrndx = SHN_XINDEX
+
+    shdr = endian + layout['shdr']
+    shoff = _align(base + len(tail), layout['align'])
+    tail += b'\0' * (shoff - base - len(tail))
+    for header in sections:
+        tail += struct.pack(shdr, *header)
+    return note_offset, tail, (shoff, header_shnum, header_shstrndx)
+
+def _write_tail(f, base, tail, layout, endian, headers):
+    """Write a tail at base, then point the ELF header at its section headers once it is on disk."""
+    f.seek(base)
+    f.write(tail)
+    f.flush()
+    os.fsync(f.fileno())
+
+    # switching the ELF header over to the new section headers is the only in-place write
+    shoff, shnum, shstrndx = headers
+    offset, fmt = layout['shoff']
+    with mmap.mmap(f.fileno(), 0) as data:
+        struct.pack_into(endian + fmt, data, offset, shoff)
+        struct.pack_into(endian + 'HHH', data, layout['shcounts'], struct.calcsize(endian + layout['shdr']),
+                         shnum, shstrndx)
+        data.flush()
+
+def read_payload(notes_file):
+    """Read the notes (or '-' for stdin) as bytes, checking that they decode; returns (payload, compressed)."""
+    if notes_file == '-':
+        payload = sys.stdin.buffer.read()
+    else:
+        with open(notes_file, 'rb') as f:
+            payload = f.read()
+    compressed = is_compressed(payload)
+    decode_notes(payload, compressed)
+    return payload, compressed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Embed package notes into an ELF binary without objcopy')
+    parser.add_argument('notes_file', help="notes JSON from make_notes.py ('-' for stdin)")
+    parser.add_argument('target', help='ELF file to patch in place')
+    parser.add_argument('output', nargs='?', help='copy target here and patch the copy instead')
+    parser.add_argument('--section', default=NOTE_SECTION, help='section name (default: %(default)s)')
+    parser.add_argument('--note-format', choices=['raw', 'elf'], default='raw',
+                        help='raw JSON section contents like objcopy writes (default), or an FDO ELF note')
+    parser.add_argument('--incremental', action='store_true',
+                        help='leave the binary alone when it already carries exactly these notes')
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='directory for incremental results (default: %(default)s)')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    try:
+        payload, compressed = read_payload(args.notes_file)
+    except (OSError, ValueError, zlib.error) as e:
+        print(f"Error reading notes: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if compressed and args.note_format == 'raw':
+        print("Error: compressed notes need an ELF note to carry their type (--note-format elf)", file=sys.stderr)
+        sys.exit(1)
+
+    target = args.output or args.target
+    if args.incremental:
+        store = incremental.ResultStore('embed_notes', args.cache_dir)
+        inputs = incremental.digest_inputs(EMBED_FORMAT, hashlib.sha256(payload).hexdigest(), args.section,
+                                            args.note_format)
+        pre = incremental.file_digest(args.target)
+        # a result is keyed by its own content: a file that already is this embed's output needs no work
+        stamp = store.load_json(incremental.digest_inputs('embed_notes', incremental.file_digest(target), inputs))
+        if stamp is not None and (not args.output or stamp['pre'] == pre):
+            incremental.report('embed_notes', True, inputs, f"{target} already carries these notes")
+            return
+        incremental.report('embed_notes', False, inputs)
+
+    if args.output:
+        shutil.copy2(args.target, args.output)
+
+    try:
+        result = embed_note(target, payload, args.section, args.note_format, compressed)
+    except (OSError, ElfError) as e:
+        print(f"Error embedding notes into {target}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.incremental:
+        post = incremental.file_digest(target)
+        store.store_json(incremental.digest_inputs('embed_notes', post, inputs), {'pre': pre, 'post': post})
+
+    print(f"Wrote {result['size']} byte {args.section} section into {target} ({result['appended']} bytes appended)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
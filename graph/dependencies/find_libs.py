@@ -1,26 +1,91 @@
 #!/usr/bin/env python3
 import sys
 import json
+import hashlib
+import logging
+import time
+import argparse
+import multiprocessing
 import subprocess
 import re
 import os
 from pathlib import Path
-
-def debug(msg):
-    """Print debug information."""
-    print(f"DEBUG: {msg}", file=sys.stderr)
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import incremental
+import resolver_cache
+from pkgdb import ANY_ARCH, BACKENDS, OwnershipIndex, detect_backend, get_backend
+from linker_trace import read_linked_libraries
+from linker_search import SearchPathIndex, parse_link_line, parse_search_dirs
+from ld_cache import LD_CACHE_FILE, LdCacheError, LibraryIndex, ld_cache_mapping, read_ld_cache
+
+log = logging.getLogger('find_libs')
+
+# bump when libs.json can come out differently for the same inputs (resolution or layout changes)
+LIBS_FORMAT = 1
+
+class StageProfile:
+    """Wall time and call counts per resolver stage, plus the number of subprocesses spawned."""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.subprocesses = 0
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['count'] += 1
+
+    def add(self, other):
+        """Fold a snapshot (e.g. from a batch worker) into this profile."""
+        for name, entry in other['stages'].items():
+            mine = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+            mine['seconds'] += entry['seconds']
+            mine['count'] += entry['count']
+        self.subprocesses += other['subprocesses']
+
+    def snapshot(self):
+        return {'stages': self.stages, 'subprocesses': self.subprocesses}
+
+    def reset(self):
+        self.stages = {}
+        self.subprocesses = 0
+
+profile = StageProfile()
+
+def run_command(args):
+    """subprocess.run wrapper that keeps the profile's subprocess count honest."""
+    profile.subprocesses += 1
+    return subprocess.run(args, capture_output=True, text=True, check=True)
 
 def parse_ldflags(flags_str):
     """Extract library names from LD flags string."""
     libs = [lib[2:] for lib in flags_str.split() if lib.startswith('-l')]
-    debug(f"Parsed library flags: {libs}")
+    log.debug("Parsed library flags: %s", libs)
     return libs
 
-def get_ldconfig_cache():
-    """Get the ldconfig cache mapping."""
-    debug("Fetching ldconfig cache...")
+def get_ldconfig_cache(cache_file=LD_CACHE_FILE):
+    """Get the ldconfig cache, indexed for library name lookups (None if neither source could be read)."""
+    log.debug("Reading ldconfig cache from %s...", cache_file)
+    try:
+        cache = ld_cache_mapping(read_ld_cache(cache_file))
+        log.info("Loaded %s library entries from %s", len(cache), cache_file)
+        return LibraryIndex(cache)
+    except (OSError, LdCacheError) as e:
+        log.warning("Unable to read %s directly (%s), falling back to ldconfig -p", cache_file, e)
+
     try:
-        result = subprocess.run(['ldconfig', '-p'], capture_output=True, text=True, check=True)
+        result = run_command(['ldconfig', '-p', '-C', cache_file])
         lines = result.stdout.splitlines()[1:]  # Skip header line
         cache = {}
         for line in lines:
@@ -31,151 +96,354 @@ def get_ldconfig_cache():
                 if lib_name not in cache:
                     cache[lib_name] = []
                 cache[lib_name].append(lib_path)
-                debug(f"Found library mapping: {lib_name} => {lib_path}")
 
-        debug(f"Loaded {len(cache)} library entries from ldconfig")
-        return cache
-    except subprocess.CalledProcessError as e:
-        debug(f"Error running ldconfig: {e}")
-        return {}
+        log.info("Loaded %s library entries from ldconfig", len(cache))
+        return LibraryIndex(cache)
+    except (OSError, subprocess.CalledProcessError) as e:
+        log.warning("Error running ldconfig: %s", e)
+        return None
 
 def find_library_files(lib_name, ldconfig_cache):
-    """Find all potential files for a given library name."""
-    debug(f"\nSearching for library: {lib_name}")
-    files = []
-    patterns = [
-        f'lib{lib_name}.so',
-        f'lib{lib_name}.',
-        f'lib{lib_name}',
-    ]
-
-    debug(f"Looking for patterns: {patterns}")
+    """Find all potential files for a given library name, most likely first."""
+    log.debug("Searching for library: %s", lib_name)
+    with profile.stage('candidate_search'):
+        files = ldconfig_cache.find(lib_name)
 
-    for pattern in patterns:
-        matching_libs = [
-            path for name, paths in ldconfig_cache.items()
-            for path in paths
-            if name.startswith(pattern)
-        ]
-        if matching_libs:
-            debug(f"Found matches for {pattern}: {matching_libs}")
-        files.extend(matching_libs)
-
-    if not files:
-        debug(f"No files found for library {lib_name}")
+    if files:
+        log.debug("Found candidates for lib%s: %s", lib_name, files)
+    else:
+        log.debug("No files found for library %s", lib_name)
 
     return files
 
-def resolve_package_for_file(file_path):
-    """Find debian package for a file, trying both direct path and realpath."""
-    debug(f"\nResolving package for file: {file_path}")
+def find_owners(file_path, owners):
+    """Return (path, (package, arch)) ownership hits for a file, trying both direct path and realpath."""
     paths_to_try = [file_path]
 
     # Add realpath if different
     real_path = os.path.realpath(file_path)
     if real_path != file_path:
-        debug(f"Adding realpath: {real_path}")
+        log.debug("Adding realpath: %s", real_path)
         paths_to_try.append(real_path)
 
-    for path in paths_to_try:
-        debug(f"Trying path: {path}")
-        try:
-            # Run dpkg -S to find package
-            debug(f"Running: dpkg -S {path}")
-            result = subprocess.run(
-                ['dpkg', '-S', path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            # Parse output like "libz1:arm64: /lib/aarch64-linux-gnu/libz.so.1"
-            debug(f"dpkg -S output: {result.stdout.strip()}")
-            package = result.stdout.split(':')[0]
-            debug(f"Found package: {package}")
-
-            # Get version information
-            debug(f"Getting version for package: {package}")
-            version_result = subprocess.run(
-                ['dpkg-query', '-W', '-f=${Version}', package],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            version = version_result.stdout.strip()
-            debug(f"Found version: {version}")
+    # Exact matches first (what dpkg -S / rpm -qf would report), then through usrmerge-style aliases
+    hits = []
+    for lookup in (owners.lookup, owners.lookup_canonical):
+        for path in paths_to_try:
+            package = lookup(path)
+            if package:
+                log.debug("Found package %s for path %s", package, path)
+                hits.append((path, package))
+    return hits
+
+def resolve_package_for_file(file_path, owners, packages):
+    """Find the owning package for a file, trying both direct path and realpath."""
+    log.debug("Resolving package for file: %s", file_path)
+    with profile.stage('ownership_resolution'):
+        hits = find_owners(file_path, owners)
+
+    with profile.stage('version_lookup'):
+        for path, (package, arch) in hits:
+            # Get version information, for the owner's own architecture where the database tells them apart
+            pkg = packages.get((package, arch)) or packages.get((package, ANY_ARCH))
+            if not pkg:
+                log.debug("No status entry for package: %s:%s", package, arch)
+                continue
+            log.debug("Found version: %s", pkg['version'])
 
             return {
                 'package': package,
-                'version': version,
+                'version': pkg['version'],
+                'arch': pkg['architecture'],
+                'source': pkg['source'],
+                'source_version': pkg['source_version'],
                 'path': path
             }
-        except subprocess.CalledProcessError as e:
-            debug(f"Error resolving {path}: {e}")
-            debug(f"stderr: {e.stderr}")
-            continue
 
-    debug(f"Failed to resolve package for {file_path}")
+    log.debug("Failed to resolve package for %s", file_path)
     return None
 
-def analyze_libs(flags_str):
-    """Analyze libraries from LD flags."""
-    debug("\nStarting library analysis...")
-    debug(f"Input flags: {flags_str}")
+def database_fingerprint(ld_cache_file, backend, extra=(), root='/'):
+    """Fingerprint of the ld cache and package database (plus any extra paths, by mtime/size)."""
+    stat_only, hashed = backend.database_inputs(root)
+    return resolver_cache.fingerprint([ld_cache_file] + stat_only + list(extra), hashed=[ld_cache_file] + hashed)
+
+def load_indexes(ld_cache_file=LD_CACHE_FILE, cache_dir=None, db_type=None, root='/'):
+    """Load the ld cache, file ownership and package indexes, reusing the on-disk cache when nothing changed.
+
+    Returns (ldconfig cache, ownership index, package table, package type).
+    """
+    backend = get_backend(db_type) if db_type else detect_backend(root)
+    log.info("Using %s package database", backend.DB_TYPE)
+
+    if cache_dir:
+        current = database_fingerprint(ld_cache_file, backend, root=root)
+        cache_name = f"{backend.DB_TYPE}:{os.path.abspath(root)}:{os.path.abspath(ld_cache_file)}"
+        cache_file = resolver_cache.cache_path(cache_dir, cache_name)
+        indexes = resolver_cache.load(cache_file, current)
+        if indexes:
+            log.info("Using cached indexes from %s", cache_file)
+            return (
+                LibraryIndex(indexes['ldconfig']),
+                OwnershipIndex(indexes['owners'], indexes['aliases']),
+                indexes['packages'],
+                backend.DB_TYPE,
+            )
+        log.info("No valid resolver cache at %s, rebuilding indexes", cache_file)
+
+    ldconfig_cache = get_ldconfig_cache(ld_cache_file)
+    if ldconfig_cache is None:
+        # resolve against an empty index this time, but don't cache it: the fingerprint is still valid
+        ldconfig_cache = LibraryIndex({})
+        cache_dir = None
+
+    # Index file ownership and package versions once for the whole run
+    owners, packages = backend.load_database(root)
+    log.info("Loaded %s owned paths and %s packages from the %s database", len(owners), len(packages), backend.DB_TYPE)
+
+    if cache_dir:
+        try:
+            resolver_cache.store(cache_file, current, {
+                'ldconfig': ldconfig_cache.cache,
+                'owners': owners.owners,
+                'aliases': owners.aliases,
+                'packages': packages,
+            })
+            log.info("Saved resolver cache to %s", cache_file)
+        except OSError as e:
+            log.warning("Unable to save resolver cache: %s", e)
+
+    return ldconfig_cache, owners, packages, backend.DB_TYPE
+
+def library_entry(ldflag, lib, pkg_info, pkg_type='deb'):
+    """Build the libs.json entry for one -l flag, resolved or not."""
+    if not pkg_info:
+        log.debug("Failed to resolve package for %s", lib)
+        return {
+            'name': "lib"+lib,
+            'version': 'unknown',
+            'path': 'not found',
+            'type': pkg_type,
+            'ldconfig': lib,
+            'ldflag': [ldflag]
+        }
+
+    log.debug("Successfully resolved %s to %s", lib, pkg_info)
+    return {
+        'name': pkg_info['package'],
+        'version': pkg_info['version'],
+        'path': pkg_info['path'],
+        'type': pkg_type,
+        'arch': pkg_info['arch'],
+        'source': pkg_info['source'],
+        'source_version': pkg_info['source_version'],
+        'ldconfig': lib,
+        'ldflag': [ldflag]
+    }
+
+def analyze_linked_libs(flags_str, search_index, owners, packages, pkg_type):
+    """Resolve -l flags to the exact archive or shared object the linker would pick."""
+    libs, lib_dirs = parse_link_line(flags_str)
+    log.debug("Parsed library flags: %s", libs)
+    log.debug("Library directories from flags: %s", lib_dirs)
+
+    # -L directories are searched before the compiler's own, in the order given
+    index = SearchPathIndex(lib_dirs, base=search_index)
+
+    result = []
+    for lib, static in libs:
+        log.debug("Processing ldflag: %s (%s)", lib, 'static' if static else 'dynamic')
+        with profile.stage('candidate_search'):
+            path = index.resolve(lib, static)
+        log.debug("Linker would use: %s", path)
+        pkg_info = resolve_package_for_file(path, owners, packages) if path else None
+        result.append(library_entry(lib, lib, pkg_info, pkg_type))
+    return result
+
+def load_resolver(ld_cache_file=LD_CACHE_FILE, cache_dir=None, search_dirs=None, db_type=None, root='/'):
+    """Build everything needed to resolve LDFLAGS, once, so it can be shared across targets."""
+    with profile.stage('cache_load'):
+        ldconfig_cache, owners, packages, pkg_type = load_indexes(ld_cache_file, cache_dir, db_type, root)
+
+    search_index = None
+    if search_dirs is not None:
+        with profile.stage('cache_load'):
+            search_index = SearchPathIndex(search_dirs)
+        log.info("Indexed %s files across %s search directories", len(search_index.files), len(search_index.dirs))
+
+    return {
+        'ldconfig': ldconfig_cache,
+        'owners': owners,
+        'packages': packages,
+        'type': pkg_type,
+        'search': search_index,
+    }
+
+def resolve_libs(flags_str, resolver):
+    """Analyze libraries from LD flags against a loaded resolver."""
+    log.debug("Starting library analysis...")
+    log.debug("Input flags: %s", flags_str)
+
+    owners = resolver['owners']
+    packages = resolver['packages']
+    pkg_type = resolver['type']
+
+    if resolver['search'] is not None:
+        result = analyze_linked_libs(flags_str, resolver['search'], owners, packages, pkg_type)
+        log.debug("Analysis complete.")
+        return merge(result)
 
     result = []
 
     # Special cases that are part of libc
     special_libs = {'m', 'pthread', 'dl', 'rt'}
-    debug(f"Special libraries (built-in): {special_libs}")
+    log.debug("Special libraries (built-in): %s", special_libs)
 
     # Get library names from flags
     libs = parse_ldflags(flags_str)
 
-    # Get ldconfig cache
-    ldconfig_cache = get_ldconfig_cache()
-
     for ldflag in libs:
-        debug(f"\nProcessing ldflag: {ldflag}")
+        log.debug("Processing ldflag: %s", ldflag)
         if ldflag in special_libs:
-            debug(f"{ldflag} is a special (built-in) library")
+            log.debug("%s is a special (built-in) library", ldflag)
             lib = "c"
         else:
             lib = ldflag
 
         # Find all potential library files
-        lib_files = find_library_files(lib, ldconfig_cache)
+        lib_files = find_library_files(lib, resolver['ldconfig'])
 
         # Try to find package for each file until we get a hit
         pkg_info = None
         for file in lib_files:
-            pkg_info = resolve_package_for_file(file)
+            pkg_info = resolve_package_for_file(file, owners, packages)
             if pkg_info:
-                debug(f"Successfully resolved {lib} to {pkg_info}")
-                result.append({
-                    'name': pkg_info['package'],
-                    'version': pkg_info['version'],
-                    'path': pkg_info['path'],
-                    'type': 'deb',
-                    'ldconfig': lib,
-                    'ldflag': [ldflag]
-                })
                 break
 
-        if not pkg_info:
-            debug(f"Failed to resolve package for {lib}")
-            result.append({
-                'name': "lib"+lib,
-                'version': 'unknown',
-                'path': 'not found',
-                'type': 'deb',
-                'ldconfig': lib,
-                'ldflag': [ldflag]
-            })
+        result.append(library_entry(ldflag, lib, pkg_info, pkg_type))
 
-    debug("\nAnalysis complete.")
+    log.debug("Analysis complete.")
     return merge(result)
 
+def resolve_linker_record(record_file, resolver):
+    """Resolve exactly the archives and shared objects a linker --trace or -Map file says were used."""
+    log.debug("Starting library analysis...")
+    log.debug("Input linker record: %s", record_file)
+
+    with profile.stage('candidate_search'):
+        libraries = read_linked_libraries(record_file)
+
+    result = []
+    for path, ldflag in libraries:
+        log.debug("Processing linked file: %s", path)
+        pkg_info = resolve_package_for_file(path, resolver['owners'], resolver['packages'])
+        result.append(library_entry(ldflag, ldflag, pkg_info, resolver['type']))
+
+    log.debug("Analysis complete.")
+    return merge(result)
+
+def analyze_libs(flags_str, ld_cache_file=LD_CACHE_FILE, cache_dir=None, search_dirs=None, db_type=None, root='/'):
+    """Analyze libraries from LD flags.
+
+    With search_dirs, libraries are resolved through the linker search path (honouring
+    -static, -Bstatic/-Bdynamic and -L) instead of by name through the ldconfig cache.
+    """
+    return resolve_libs(flags_str, load_resolver(ld_cache_file, cache_dir, search_dirs, db_type, root))
+
+# Resolver shared with batch workers; each worker's initializer sets it from the pool's initargs
+_batch_resolver = None
+
+def _init_batch_worker(resolver, profiling=False):
+    global _batch_resolver
+    _batch_resolver = resolver
+    profile.enabled = profiling
+
+def _resolve_target(job):
+    target, flags_str, record_file, output = job
+    # each job reports only its own timings; the parent sums them
+    profile.reset()
+    try:
+        if record_file:
+            libs = resolve_linker_record(record_file, _batch_resolver)
+        else:
+            libs = resolve_libs(flags_str, _batch_resolver)
+    except Exception as e:
+        record = {'target': target, 'error': str(e)}
+    else:
+        record = {'target': target, 'libs': libs}
+        if output:
+            parent = os.path.dirname(output)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            with open(output, 'w') as f:
+                json.dump(libs, f, indent=2)
+            record['output'] = output
+
+    if profile.enabled:
+        record['_profile'] = profile.snapshot()
+    return record
+
+def read_manifest(manifest_file):
+    """Read a JSON Lines manifest of {"target": ..., "ldflags": ...} (or "linker_trace": ...) objects."""
+    jobs = []
+    with open(manifest_file, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if 'target' not in entry or ('ldflags' not in entry and 'linker_trace' not in entry):
+                raise ValueError(f"{manifest_file}:{line_number}: expected 'target' and 'ldflags' or 'linker_trace'")
+            jobs.append(entry)
+    return jobs
+
+def target_output_path(output_dir, target):
+    """Per-target libs.json path: the target name flattened into a safe file name, plus a short hash
+    of the original name so targets that flatten alike (a/b and a_b) get different files."""
+    digest = hashlib.sha256(target.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(output_dir, f"{re.sub(r'[^A-Za-z0-9._-]', '_', target)}-{digest}.libs.json")
+
+def run_batch(manifest_file, resolver, out, output_dir=None, jobs=None):
+    """Resolve every manifest target with a worker pool, streaming one JSON line per target to out."""
+    entries = read_manifest(manifest_file)
+    log.info("Loaded %s targets from %s", len(entries), manifest_file)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    work = [
+        (
+            entry['target'],
+            entry.get('ldflags', ''),
+            entry.get('linker_trace'),
+            entry.get('output') or (target_output_path(output_dir, entry['target']) if output_dir else None),
+        )
+        for entry in entries
+    ]
+
+    # fork shares the already-built indexes with the workers without pickling them
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                             initializer=_init_batch_worker, initargs=(resolver, profile.enabled)) as pool:
+        chunksize = max(1, len(work) // ((jobs or os.cpu_count() or 1) * 4))
+        for record in pool.map(_resolve_target, work, chunksize=chunksize):
+            worker_profile = record.pop('_profile', None)
+            if worker_profile:
+                profile.add(worker_profile)
+            if 'error' in record:
+                failures += 1
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+
+    return failures
+
 def merge(result):
+    with profile.stage('merge'):
+        return _merge(result)
+
+def _merge(result):
     merged = {}
 
     for entry in result:
@@ -189,25 +457,157 @@ def merge(result):
 
     return sorted(list(merged.values()), key=lambda x: x['name'])
 
+def incremental_key(args, search_dirs):
+    """Content address of everything a single-target run's libs.json depends on."""
+    backend = get_backend(args.package_db) if args.package_db else detect_backend(args.root)
+    return incremental.digest_inputs(
+        'find_libs',
+        LIBS_FORMAT,
+        args.ldflags,
+        args.linker_trace and incremental.file_digest(args.linker_trace),
+        search_dirs,
+        database_fingerprint(args.ld_cache, backend, extra=search_dirs or (), root=args.root),
+    )
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Map -l LDFLAGS to the packages that provide them', allow_abbrev=False)
+    parser.add_argument('ldflags', nargs='*', help='LDFLAGS string, e.g. "-static -lz -lm"')
+    parser.add_argument('--ld-cache', default=LD_CACHE_FILE,
+                        help=f'ld.so.cache to resolve library names against (default: {LD_CACHE_FILE})')
+    parser.add_argument('--cache-dir', default=resolver_cache.default_cache_dir(),
+                        help='directory for the persistent resolver cache (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true', help='always rebuild the indexes from scratch')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse the previous libs.json when the flags and package database are unchanged')
+    parser.add_argument('--package-db', choices=sorted(BACKENDS),
+                        help='package database to resolve files against (default: detect dpkg or rpm)')
+    parser.add_argument('--root', default='/', help='root directory holding the package database (default: /)')
+    parser.add_argument('--linker-search', action='store_true',
+                        help="resolve -l flags through the compiler's library search path (for -static builds)")
+    parser.add_argument('--search-dir', action='append', default=[],
+                        help='library search directory for --linker-search, instead of asking the compiler (repeatable)')
+    parser.add_argument('--cc', default='gcc', help='compiler driver queried for search directories (default: gcc)')
+    parser.add_argument('--linker-trace', metavar='FILE',
+                        help='resolve the libraries recorded in -Wl,--trace output or a -Wl,-Map file instead of LDFLAGS')
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help='JSON Lines manifest of {"target": ..., "ldflags": ...} to resolve with one shared index')
+    parser.add_argument('--output', help='batch results file, one JSON object per target (default: stdout)')
+    parser.add_argument('--output-dir', help='write a <target>-<hash>.libs.json per batch target into this directory')
+    parser.add_argument('--jobs', type=int, help='batch worker processes (default: CPU count)')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='log progress to stderr; repeat for per-library debug output')
+    parser.add_argument('--profile', action='store_true', help='report per-stage timings as JSON on stderr')
+    parser.add_argument('--profile-output', metavar='FILE', help='write the --profile report to FILE (implies --profile)')
+
+    # bare linker flags such as "-lz" look like options to argparse, so fold them back into the LDFLAGS
+    args, extra = parser.parse_known_args()
+    args.ldflags = ' '.join(args.ldflags + extra)
+    inputs = [bool(args.ldflags), bool(args.linker_trace), bool(args.batch)]
+    if not any(inputs):
+        parser.error("no LDFLAGS given")
+    if sum(inputs) > 1:
+        parser.error("LDFLAGS, --linker-trace and --batch are mutually exclusive")
+    if args.profile_output:
+        args.profile = True
+    return args
+
+def write_profile(destination, wall_seconds, incremental_hit=None):
+    """Emit the profile summary as JSON to a file, or to stderr when destination is None.
+
+    incremental_hit records whether --incremental reused libs.json (None when it was not asked for).
+    """
+    summary = {
+        'wall_seconds': round(wall_seconds, 6),
+        'subprocesses': profile.subprocesses,
+        'stages': {
+            name: {'seconds': round(entry['seconds'], 6), 'count': entry['count']}
+            for name, entry in sorted(profile.stages.items())
+        },
+    }
+    if incremental_hit is not None:
+        summary['incremental'] = 'hit' if incremental_hit else 'miss'
+    if destination is None:
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+    else:
+        with open(destination, 'w') as f:
+            json.dump(summary, f, indent=2)
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: analyze_libs.py <LDFLAGS>", file=sys.stderr)
-        sys.exit(1)
+    args = parse_args()
+
+    levels = [logging.WARNING, logging.INFO, logging.DEBUG]
+    logging.basicConfig(level=levels[min(args.verbose, 2)], format='%(levelname)s: %(message)s', stream=sys.stderr)
+    profile.enabled = args.profile
+    started = time.perf_counter()
 
-    debug("Starting library analysis script...")
-    debug(f"Arguments: {sys.argv}")
+    log.debug("Starting library analysis script...")
+    log.debug("Arguments: %s", sys.argv)
 
-    ldflags = sys.argv[1]
-    result = analyze_libs(ldflags)
+    search_dirs = None
+    if args.search_dir:
+        search_dirs = args.search_dir
+    elif args.linker_search:
+        try:
+            search_dirs = parse_search_dirs(run_command([args.cc, '-print-search-dirs']).stdout)
+        except (OSError, subprocess.CalledProcessError) as e:
+            log.warning("Unable to get search directories from %s: %s", args.cc, e)
+            search_dirs = []
+        log.debug("Compiler search directories: %s", search_dirs)
+
+    key = None
+    hit = None
+    if args.incremental and not args.batch:
+        store = incremental.ResultStore('find_libs', args.cache_dir)
+        key = incremental_key(args, search_dirs)
+        output = store.load(key)
+        hit = output is not None
+        incremental.report('find_libs', hit, key, 'libs.json is up to date' if hit else '')
+        if hit:
+            incremental.write_if_changed('libs.json', output)
+            print(output.decode())
+            if profile.enabled:
+                write_profile(args.profile_output, time.perf_counter() - started, hit)
+            return
+
+    resolver = load_resolver(args.ld_cache, None if args.no_cache else args.cache_dir, search_dirs, args.package_db, args.root)
+
+    if args.batch:
+        try:
+            if args.output:
+                with open(args.output, 'w') as out:
+                    failures = run_batch(args.batch, resolver, out, args.output_dir, args.jobs)
+            else:
+                failures = run_batch(args.batch, resolver, sys.stdout, args.output_dir, args.jobs)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if profile.enabled:
+            write_profile(args.profile_output, time.perf_counter() - started)
+        log.debug("Script complete.")
+        sys.exit(1 if failures else 0)
+
+    if args.linker_trace:
+        try:
+            result = resolve_linker_record(args.linker_trace, resolver)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        result = resolve_libs(args.ldflags, resolver)
 
     # Write to JSON file
-    debug("\nWriting results to lib.json")
+    log.debug("Writing results to lib.json")
+    output = json.dumps(result, indent=2)
     with open('libs.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        f.write(output)
+    if key:
+        store.store(key, output.encode())
 
     # Also print to stdout
-    print(json.dumps(result, indent=2))
-    debug("Script complete.")
+    print(output)
+    if profile.enabled:
+        write_profile(args.profile_output, time.perf_counter() - started, hit)
+    log.debug("Script complete.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import io
+import json
+import posixpath
+import tarfile
+
+from embed_notes import ELF_MAGIC, NOTE_SECTION, ElfError, SH_OFFSET, SH_SIZE, note_payload, read_elf
+
+# bytes kept from the start of each ELF member (allocated notes, e.g. distro package notes, live here)
+HEAD_BYTES = 64 * 1024
+# bytes kept behind the read position; objcopy and embed_notes.py both place the note and
+# the section name table just before the section header table at the end of the file
+WINDOW_BYTES = 1024 * 1024
+READ_CHUNK = 64 * 1024
+
+# members of the outer archive that are not layers are image metadata (manifest.json, index.json, configs)
+MAX_METADATA_BYTES = 4 * 1024 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+WHITEOUT_PREFIX = '.wh.'
+OPAQUE_WHITEOUT = '.wh..wh..opq'
+
+class StreamView:
+    """Forward-only, sliceable view of a stream that only keeps its head and a trailing window.
+
+    Slicing reads ahead as needed; asking for bytes that have already been dropped raises
+    ElfError, so memory stays bounded however large the member is.
+    """
+
+    def __init__(self, stream, size, head=HEAD_BYTES, window=WINDOW_BYTES):
+        self.stream = stream
+        self.size = size
+        self.head_size = head
+        self.window_size = window
+        self.head = bytearray()
+        self.window = bytearray()
+        self.window_start = 0
+        self.pos = 0
+
+    def __len__(self):
+        return self.size
+
+    def _advance(self, end):
+        while self.pos < end:
+            chunk = self.stream.read(min(READ_CHUNK, end - self.pos))
+            if not chunk:
+                self.size = self.pos
+                return
+            if self.pos < self.head_size:
+                self.head += chunk[:self.head_size - self.pos]
+            self.window += chunk
+            self.pos += len(chunk)
+            # trim in bulk rather than per chunk to avoid shuffling the buffer constantly
+            if len(self.window) > 2 * self.window_size:
+                drop = len(self.window) - self.window_size
+                del self.window[:drop]
+                self.window_start += drop
+
+    def __getitem__(self, key):
+        start, stop = key.start or 0, min(key.stop, self.size)
+        if stop <= start:
+            return b''
+        if stop > self.pos:
+            self._advance(stop)
+            stop = min(stop, self.pos)
+        if stop <= len(self.head):
+            return bytes(self.head[start:stop])
+        if start >= self.window_start:
+            return bytes(self.window[start - self.window_start:stop - self.window_start])
+        raise ElfError(f"bytes {start}-{stop} are outside the buffered window")
+
+def read_member_note(stream, size, section=NOTE_SECTION):
+    """Return (is_elf, (payload, compressed) or None) for one archive member, reading it forward once."""
+    view = StreamView(stream, size)
+    if view[0:4] != ELF_MAGIC:
+        return False, None
+    elf = read_elf(view)
+    for header, name in zip(elf['sections'], elf['names']):
+        if name == section:
+            contents = view[header[SH_OFFSET]:header[SH_OFFSET] + header[SH_SIZE]]
+            return True, note_payload(contents, elf['endian'])
+    return True, None
+
+class _Prefixed:
+    """File-like object that replays already-peeked bytes before the rest of a stream."""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if not self.prefix:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.prefix = self.prefix + self.stream.read(), b''
+            return data
+        data, self.prefix = self.prefix[:size], self.prefix[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+def _is_layer(peek):
+    return peek.startswith(GZIP_MAGIC) or peek[257:262] == b'ustar'
+
+def _normalize(name):
+    return posixpath.normpath('/' + name)
+
+def _empty_layer():
+    return {'notes': {}, 'errors': {}, 'unnoted': set(), 'whiteouts': set(), 'opaque': set()}
+
+def scan_layer(stream, section=NOTE_SECTION):
+    """Read one layer tar (plain or gzip) sequentially into its notes, whiteouts and note-less ELF files.
+
+    Only paths that matter for the final notes are kept, so memory follows the number of ELF
+    files rather than of all files in the layer. Hard links report the note of their target.
+    """
+    layer = _empty_layer()
+    with tarfile.open(fileobj=stream, mode='r|*') as tar:
+        for member in tar:
+            path = _normalize(member.name)
+            directory, base = posixpath.split(path)
+            if base == OPAQUE_WHITEOUT:
+                layer['opaque'].add(directory)
+                continue
+            if base.startswith(WHITEOUT_PREFIX):
+                layer['whiteouts'].add(posixpath.join(directory, base[len(WHITEOUT_PREFIX):]))
+                continue
+            if member.islnk():
+                # a hard link names a member earlier in the same layer
+                target = _normalize(member.linkname)
+                if target in layer['notes']:
+                    layer['notes'][path] = layer['notes'][target]
+                elif target in layer['errors']:
+                    layer['errors'][path] = layer['errors'][target]
+                elif target in layer['unnoted']:
+                    layer['unnoted'].add(path)
+                continue
+            if not member.isreg():
+                continue
+
+            try:
+                elf, note = read_member_note(tar.extractfile(member), member.size, section)
+            except (ElfError, OSError) as e:
+                layer['errors'][path] = str(e)
+                continue
+            if note is not None:
+                layer['notes'][path] = note
+            elif elf:
+                layer['unnoted'].add(path)
+    return layer
+
+def _under(path, directory):
+    return path == directory or path.startswith(directory.rstrip('/') + '/')
+
+def apply_layers(layers):
+    """Stack layers bottom to top into path -> (kind, value), kind being note, error or missing.
+
+    A lower layer's note is dropped when a higher layer whites it out (or makes its directory
+    opaque), and replaced when the higher layer puts an ELF file without a note there (missing).
+    """
+    merged = {}
+    for layer in layers:
+        hidden = [(d, True) for d in layer['opaque']] + [(p, False) for p in layer['whiteouts']]
+        for target, opaque in hidden:
+            for path in [p for p in merged if _under(p, target) and not (opaque and p == target)]:
+                del merged[path]
+        for path in layer['unnoted']:
+            merged[path] = ('missing', None)
+        for path, note in layer['notes'].items():
+            merged[path] = ('note', note)
+        for path, error in layer['errors'].items():
+            merged[path] = ('error', error)
+    return merged
+
+def _buffered_layer(name, data, section):
+    """Scan a layer that was buffered as metadata because it did not look like one."""
+    try:
+        return scan_layer(io.BytesIO(data), section)
+    except tarfile.TarError as e:
+        layer = _empty_layer()
+        layer['errors'][name] = f"unreadable layer: {e}"
+        return layer
+
+def _blob_name(digest):
+    algorithm, _, value = digest.partition(':')
+    return f"blobs/{algorithm}/{value}"
+
+def image_layer_lists(metadata):
+    """Return [(image name, [layer member names bottom to top])] from docker save or OCI metadata."""
+    if 'manifest.json' in metadata:
+        images = []
+        for entry in json.loads(metadata['manifest.json']):
+            tags = entry.get('RepoTags') or [entry.get('Config', '')]
+            images.append((tags[0], entry['Layers']))
+        return images
+
+    images = []
+    index = json.loads(metadata.get('index.json', b'{}'))
+    for descriptor in index.get('manifests', []):
+        manifest = json.loads(metadata[_blob_name(descriptor['digest'])])
+        name = descriptor.get('annotations', {}).get('org.opencontainers.image.ref.name', descriptor['digest'])
+        images.append((name, [_blob_name(layer['digest']) for layer in manifest.get('layers', [])]))
+    return images
+
+def scan_image(tar_path, section=NOTE_SECTION, include_missing=False):
+    """Yield (image, path, kind, value) for every note in a docker save / OCI archive, without unpacking it.
+
+    kind is note or error, or missing (value None) for an ELF file without a note when
+    include_missing is set. The outer archive is read once, front to back: layers are scanned as
+    they stream past (only their notes, whiteouts and note-less ELF paths are kept) and small
+    metadata members are buffered, so the layer order from the manifest can be applied at the end.
+    A member the manifest names as a layer is one whatever it looks like (docker save writes an
+    all-zero tar for a layer without files); small ones are scanned from the buffer.
+    """
+    layers = {}
+    metadata = {}
+    unrecognised = set()
+    with tarfile.open(tar_path, mode='r|*') as outer:
+        for member in outer:
+            if not member.isreg():
+                continue
+            name = posixpath.normpath(member.name)
+            stream = outer.extractfile(member)
+            peek = stream.read(512)
+            if _is_layer(peek):
+                layers[name] = scan_layer(_Prefixed(peek, stream), section)
+            elif peek.startswith(ZSTD_MAGIC):
+                layers[name] = _empty_layer()
+                layers[name]['errors'][name] = "zstd-compressed layers are not supported"
+            elif member.size <= MAX_METADATA_BYTES:
+                metadata[name] = peek + stream.read()
+            else:
+                unrecognised.add(name)
+
+    for image, layer_names in image_layer_lists(metadata):
+        for name in map(posixpath.normpath, layer_names):
+            if name not in layers and name in metadata:
+                layers[name] = _buffered_layer(name, metadata[name], section)
+        missing = [name for name in layer_names if posixpath.normpath(name) not in layers]
+        for name in missing:
+            if posixpath.normpath(name) in unrecognised:
+                yield image, name, 'error', "layer is neither a tar nor a gzip stream"
+            else:
+                yield image, name, 'error', "layer not found in archive"
+        stack = [layers[posixpath.normpath(name)] for name in layer_names if name not in missing]
+        for path, (kind, value) in sorted(apply_layers(stack).items()):
+            if kind != 'missing' or include_missing:
+                yield image, path, kind, value
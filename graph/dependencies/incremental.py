@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import sys
+
+from resolver_cache import default_cache_dir
+
+READ_CHUNK = 1024 * 1024
+# bump when the way results are keyed or stored changes
+RESULT_FORMAT = 1
+
+def file_digest(path):
+    """sha256 of a file's contents, read in chunks; None when it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+def digest_inputs(*parts):
+    """One content address for a step's inputs (strings, numbers, lists, dicts or None).
+
+    Callers include their own output format version, so a changed tool does not reuse old results.
+    """
+    return hashlib.sha256(json.dumps([RESULT_FORMAT, parts], sort_keys=True).encode()).hexdigest()
+
+class ResultStore:
+    """Outputs of a build step stored under the digest of its inputs, so unchanged inputs skip the work."""
+
+    def __init__(self, tool, cache_dir=None):
+        self.tool = tool
+        self.dir = os.path.join(cache_dir or default_cache_dir(), 'results')
+
+    def path(self, key):
+        return os.path.join(self.dir, f"{self.tool}-{key}")
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, key, data):
+        os.makedirs(self.dir, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def load_json(self, key):
+        data = self.load(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def store_json(self, key, value):
+        self.store(key, json.dumps(value).encode())
+
+def write_if_changed(path, data):
+    """Write bytes to path unless it already holds exactly them; returns whether it wrote."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def report(tool, hit, key, detail=''):
+    """One line on stderr saying whether a step was skipped."""
+    status = 'hit' if hit else 'miss'
+    print(f"{tool}: incremental {status} ({key[:12]}){' ' + detail if detail else ''}", file=sys.stderr)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+LD_CACHE_FILE = '/etc/ld.so.cache'
+
+# see glibc's sysdeps/generic/dl-cache.h for both layouts
+OLD_MAGIC = b'ld.so-1.7.0'
+NEW_MAGIC = b'glibc-ld.so.cache1.1'
+EXTENSION_MAGIC = 0xeaa42174
+EXTENSION_TAG_GLIBC_HWCAPS = 1
+HWCAP_EXTENSION = 1 << 62
+
+ENDIAN_PREFIX = {2: '<', 3: '>'}
+
+FLAG_TYPE_MASK = 0x00ff
+FLAG_REQUIRED_MASK = 0xff00
+
+FLAG_TYPES = {
+    0: 'libc4',
+    1: 'ELF',
+    2: 'libc5',
+    3: 'libc6',
+}
+
+# matches the names ldconfig -p prints in "(libc6,x86-64)"
+FLAG_ARCHES = {
+    0x0000: '',
+    0x0100: '64bit',
+    0x0200: 'IA-64',
+    0x0300: 'x86-64',
+    0x0400: '64bit',
+    0x0500: '64bit',
+    0x0600: 'N32',
+    0x0700: '64bit',
+    0x0800: 'x32',
+    0x0900: 'hard-float',
+    0x0a00: 'AArch64',
+    0x0b00: 'soft-float',
+    0x0c00: 'nan2008',
+    0x0d00: 'N32,nan2008',
+    0x0e00: '64bit,nan2008',
+    0x0f00: 'soft-float',
+    0x1000: 'double-float',
+    0x1100: 'soft-float',
+    0x1200: 'double-float',
+}
+
+class LdCacheError(Exception):
+    """Raised when a file is not a readable ld.so.cache."""
+
+def _read_string(data, offset):
+    end = data.find(b'\0', offset)
+    if end < 0:
+        raise LdCacheError(f"unterminated string at offset {offset}")
+    return os.fsdecode(data[offset:end])
+
+def describe_flags(flags):
+    """Render entry flags the way ldconfig -p does, e.g. 'libc6,x86-64'."""
+    kind = FLAG_TYPES.get(flags & FLAG_TYPE_MASK, 'unknown')
+    arch = FLAG_ARCHES.get(flags & FLAG_REQUIRED_MASK, 'unknown')
+    return f"{kind},{arch}" if arch else kind
+
+def _old_entries(data):
+    """Yield (flags, name, path, hwcap) from the libc5-era layout."""
+    nlibs, = struct.unpack_from('=I', data, 12)
+    entries_start = 16
+    strings_start = entries_start + nlibs * 12
+    if strings_start > len(data):
+        raise LdCacheError("truncated old-format cache")
+
+    for i in range(nlibs):
+        flags, key, value = struct.unpack_from('=iII', data, entries_start + i * 12)
+        yield flags, _read_string(data, strings_start + key), _read_string(data, strings_start + value), 0
+
+def _hwcaps_subdirs(data, base, endian, extension_offset):
+    """Read the glibc-hwcaps subdirectory names from the cache extension section."""
+    if not extension_offset or base + extension_offset + 8 > len(data):
+        return []
+
+    magic, count = struct.unpack_from(endian + 'II', data, base + extension_offset)
+    if magic != EXTENSION_MAGIC:
+        return []
+
+    for i in range(count):
+        tag, _, offset, size = struct.unpack_from(endian + 'IIII', data, base + extension_offset + 8 + i * 16)
+        if tag == EXTENSION_TAG_GLIBC_HWCAPS:
+            string_offsets = struct.unpack_from(endian + 'I' * (size // 4), data, base + offset)
+            return [_read_string(data, base + o) for o in string_offsets]
+    return []
+
+def _new_entries(data, base):
+    """Yield (flags, name, path, hwcap) from the glibc 2.x layout starting at base."""
+    nlibs, _, flags = struct.unpack_from('=IIB', data, base + 20)
+    endian = ENDIAN_PREFIX.get(flags, '=')
+    nlibs, _, _, extension_offset = struct.unpack_from(endian + 'IIB3xI', data, base + 20)
+
+    entries_start = base + 48
+    if entries_start + nlibs * 24 > len(data):
+        raise LdCacheError("truncated new-format cache")
+
+    hwcaps = None
+    for i in range(nlibs):
+        flags, key, value, _, hwcap = struct.unpack_from(endian + 'iIIIQ', data, entries_start + i * 24)
+        if hwcap & HWCAP_EXTENSION:
+            if hwcaps is None:
+                hwcaps = _hwcaps_subdirs(data, base, endian, extension_offset)
+            index = hwcap & 0xffffffff
+            hwcap = hwcaps[index] if index < len(hwcaps) else hwcap
+        # string offsets are relative to the start of the new-format header
+        yield flags, _read_string(data, base + key), _read_string(data, base + value), hwcap
+
+def read_ld_cache(cache_file=LD_CACHE_FILE):
+    """Parse an ld.so.cache file into a list of entries, in cache (lookup priority) order."""
+    try:
+        with open(cache_file, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        raise LdCacheError(f"empty cache file: {cache_file}")
+
+    try:
+        if data[:len(NEW_MAGIC)] == NEW_MAGIC:
+            records = _new_entries(data, 0)
+        elif data[:len(OLD_MAGIC)] == OLD_MAGIC:
+            # a compat cache embeds the new layout after the old one, 8-byte aligned
+            nlibs, = struct.unpack_from('=I', data, 12)
+            new_start = data.find(NEW_MAGIC, 16 + nlibs * 12)
+            records = _new_entries(data, new_start) if new_start >= 0 else _old_entries(data)
+        else:
+            raise LdCacheError(f"unrecognised cache format: {cache_file}")
+
+        return [
+            {
+                'name': name,
+                'path': path,
+                'flags': flags,
+                'arch': describe_flags(flags),
+                'hwcap': hwcap,
+            }
+            for flags, name, path, hwcap in records
+        ]
+    except struct.error as e:
+        raise LdCacheError(f"corrupt cache file {cache_file}: {e}")
+    finally:
+        data.close()
+
+def ld_cache_mapping(entries):
+    """Collapse cache entries into the name -> [paths] mapping find_libs.py works with."""
+    cache = {}
+    for entry in entries:
+        cache.setdefault(entry['name'], []).append(entry['path'])
+    return cache
+
+class LibraryIndex:
+    """Sorted-name index over the ld cache answering lib<name> prefix queries with bisect."""
+
+    # candidate tiers, most likely first
+    SONAME, DEVLINK, DOTTED, PREFIX = range(4)
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.names = sorted(cache)
+        # dict order is cache order, which is the linker's own lookup priority
+        self.order = {name: i for i, name in enumerate(cache)}
+
+    def __len__(self):
+        return len(self.cache)
+
+    def prefixed(self, prefix):
+        """Return all cache names starting with prefix."""
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + '\U0010ffff', start)
+        return self.names[start:end]
+
+    def rank(self, prefix, name):
+        """Place a matching name in its candidate tier."""
+        rest = name[len(prefix):]
+        if rest.startswith('.so.'):
+            return self.SONAME
+        if rest == '.so':
+            return self.DEVLINK
+        if rest.startswith('.'):
+            return self.DOTTED
+        return self.PREFIX
+
+    def find(self, lib_name):
+        """Return deduplicated candidate paths for -l<lib_name>, best candidates first."""
+        prefix = f'lib{lib_name}'
+        names = sorted(self.prefixed(prefix), key=lambda n: (self.rank(prefix, n), self.order[n]))
+
+        paths = []
+        seen = set()
+        for name in names:
+            for path in self.cache[name]:
+                if path not in seen:
+                    seen.add(path)
+                    paths.append(path)
+        return paths
+
+def main():
+    cache_file = sys.argv[1] if len(sys.argv) > 1 else LD_CACHE_FILE
+    entries = read_ld_cache(cache_file)
+    print(f"{len(entries)} libs found in cache `{cache_file}'")
+    for entry in entries:
+        hwcap = entry['hwcap']
+        if isinstance(hwcap, str):
+            extra = f", hwcap: \"{hwcap}\""
+        elif hwcap:
+            extra = f", hwcap: 0x{hwcap:016x}"
+        else:
+            extra = ''
+        print(f"\t{entry['name']} ({entry['arch']}{extra}) => {entry['path']}")
+
+if __name__ == "__main__":
+    main()
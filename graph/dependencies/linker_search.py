@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+import os
+
+def parse_search_dirs(output):
+    """Pull the library directories out of `cc -print-search-dirs` output."""
+    for line in output.splitlines():
+        if line.startswith('libraries:'):
+            # "libraries: =/usr/lib/gcc/x86_64-linux-gnu/12/:/usr/lib/..." where a leading '=' means the sysroot
+            value = line.split(':', 1)[1].strip().lstrip('=')
+            return [d for d in value.split(':') if d]
+    return []
+
+def split_link_line(flags_str):
+    """Tokenize LDFLAGS, unpacking -Wl,a,b and -Xlinker into plain linker arguments."""
+    tokens = []
+    args = flags_str.split()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith('-Wl,'):
+            tokens.extend(a for a in arg[4:].split(',') if a)
+        elif arg == '-Xlinker' and i + 1 < len(args):
+            i += 1
+            tokens.append(args[i])
+        else:
+            tokens.append(arg)
+        i += 1
+    return tokens
+
+def parse_link_line(flags_str):
+    """Return (libs, lib_dirs) where libs are (name, static) pairs in link order.
+
+    -static anywhere makes the whole link static; -Bstatic/-Bdynamic switch the mode
+    for the -l options that follow. -L directories apply to every -l, in the given order.
+    """
+    tokens = split_link_line(flags_str)
+    all_static = '-static' in tokens
+
+    libs = []
+    lib_dirs = []
+    static = all_static
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ('-Bstatic', '-dn', '-non_shared'):
+            static = True
+        elif token in ('-Bdynamic', '-dy', '-call_shared'):
+            static = all_static
+        elif token == '-L' and i + 1 < len(tokens):
+            i += 1
+            lib_dirs.append(tokens[i])
+        elif token.startswith('-L'):
+            lib_dirs.append(token[2:])
+        elif token == '-l' and i + 1 < len(tokens):
+            i += 1
+            libs.append((tokens[i], static))
+        elif token.startswith('-l'):
+            libs.append((token[2:], static))
+        i += 1
+    return libs, lib_dirs
+
+class SearchPathIndex:
+    """One scan of every linker search directory, answering -l lookups the way ld would.
+
+    A base index is searched after this one's own directories, so per-target -L
+    directories can be layered over a shared scan of the compiler's directories.
+    """
+
+    def __init__(self, search_dirs, base=None):
+        self.base = base
+        self.dirs = []
+        self.files = {}  # file name -> indexes into self.dirs, in search order
+
+        seen = set()
+        for directory in search_dirs:
+            directory = os.path.normpath(directory)
+            try:
+                st = os.stat(directory)
+            except OSError:
+                continue
+            # the same directory often appears under several spellings (../, usrmerge symlinks)
+            if (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+
+            try:
+                entries = os.listdir(directory)
+            except OSError:
+                continue
+            position = len(self.dirs)
+            self.dirs.append(directory)
+            for name in entries:
+                self.files.setdefault(name, []).append(position)
+
+    def _first(self, file_name):
+        positions = self.files.get(file_name)
+        if positions:
+            return positions[0]
+        if self.base is not None:
+            position = self.base._first(file_name)
+            if position is not None:
+                return len(self.dirs) + position
+        return None
+
+    def _dir(self, position):
+        if position < len(self.dirs):
+            return self.dirs[position]
+        return self.base._dir(position - len(self.dirs))
+
+    def resolve(self, lib_name, static=False):
+        """Return the file -l<lib_name> links against, or None.
+
+        Like ld, each directory is tried in turn; a dynamic link prefers lib<name>.so over
+        lib<name>.a within the same directory, a static link only considers the archive.
+        """
+        if lib_name.startswith(':'):
+            file_name = lib_name[1:]
+            position = self._first(file_name)
+            return None if position is None else os.path.join(self._dir(position), file_name)
+
+        archive = f'lib{lib_name}.a'
+        archive_at = self._first(archive)
+        if not static:
+            shared = f'lib{lib_name}.so'
+            shared_at = self._first(shared)
+            if shared_at is not None and (archive_at is None or shared_at <= archive_at):
+                return os.path.join(self._dir(shared_at), shared)
+
+        if archive_at is None:
+            return None
+        return os.path.join(self._dir(archive_at), archive)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import os
+import re
+
+# first lines a GNU ld -Map file can start with; anything else is treated as --trace output
+MAP_HEADERS = (
+    'Archive member included',
+    'As needed library included',
+    'Discarded input sections',
+    'Allocating common symbols',
+    'Merging program properties',
+    'Memory Configuration',
+    'Linker script and memory map',
+)
+
+# "-lz (/usr/lib/x86_64-linux-gnu/libz.a)" from newer binutils
+TRACE_FLAG = re.compile(r'^(-l\S+) \((.+)\)$')
+# archive members, printed as "archive(member)" or by older binutils as "(archive)member"
+MEMBER_NEW = re.compile(r'^(\S.*)\(([^()]+)\)$')
+MEMBER_OLD = re.compile(r'^\((.+)\)([^()]+)$')
+# an "Archive member included" entry short enough for ld to put the referencing file on the same line:
+# "/usr/lib/libz.a(deflate.o)    main.o (deflateInit_)"
+MEMBER_INCLUDED = re.compile(r'^([^()\s][^()]*)\(([^()]+)\)\s+\S')
+LIBRARY_NAME = re.compile(r'^(?:lib)?(.+?)(?:\.so(?:\.[^/]*)?|\.a)$')
+
+ELF_MAGIC = b'\x7fELF'
+ARCHIVE_MAGIC = b'!<arch>\n'
+
+def _is_library_path(path):
+    base = os.path.basename(path)
+    return base.endswith('.a') or base.endswith('.so') or '.so.' in base
+
+def is_linked_library(path):
+    """True for archives and ELF shared objects; False for text linker scripts such as libc.so."""
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(8)
+    except OSError:
+        # the record may come from another machine; trust the name
+        return True
+    return magic.startswith(ELF_MAGIC) or magic == ARCHIVE_MAGIC
+
+def library_flag(path, flag=None):
+    """The -l name a library file corresponds to, e.g. /usr/lib/libz.so.1 -> 'z'."""
+    if flag:
+        return flag[2:]
+    base = os.path.basename(path)
+    match = LIBRARY_NAME.match(base)
+    return match.group(1) if match else base
+
+def _parse_trace_line(line):
+    """Return (path, flag) for one --trace line, or None."""
+    # e.g. "/usr/bin/ld: mode elf_x86_64" or warnings from the linker
+    if ': ' in line:
+        return None
+
+    match = TRACE_FLAG.match(line)
+    if match:
+        return match.group(2), match.group(1)
+    match = MEMBER_OLD.match(line)
+    if match:
+        return match.group(1), None
+    match = MEMBER_NEW.match(line)
+    if match:
+        return match.group(1), None
+    return line, None
+
+def iter_linked_files(lines):
+    """Yield (path, flag) for each archive or shared object in ld --trace or -Map output, in one pass.
+
+    From a map file, archives are only reported when a member was actually pulled in
+    (the "Archive member included" section, where ld puts the referencing file either on the
+    member's line or, for long names, on the next one); shared objects come from LOAD lines.
+    """
+    is_map = None
+    in_members = False
+    for raw in lines:
+        line = raw.rstrip('\n')
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if is_map is None:
+            is_map = stripped.startswith(MAP_HEADERS)
+
+        if not is_map:
+            parsed = _parse_trace_line(stripped)
+            if parsed and _is_library_path(parsed[0]):
+                yield parsed
+            continue
+
+        if line[0].isspace():
+            # "    referencing-file (symbol)" continuation lines
+            continue
+
+        if stripped.startswith('Archive member included'):
+            in_members = True
+        elif stripped.startswith('LOAD '):
+            in_members = False
+            path = stripped[5:].strip()
+            if _is_library_path(path) and not path.endswith('.a'):
+                yield path, None
+        elif in_members:
+            match = MEMBER_INCLUDED.match(stripped) or MEMBER_NEW.match(stripped)
+            if not match:
+                in_members = False
+            elif _is_library_path(match.group(1)):
+                yield match.group(1), None
+
+def read_linked_libraries(record_file):
+    """Return the unique (path, flag) libraries named by a linker trace or map file, in link order."""
+    seen = set()
+    libraries = []
+    with open(record_file, 'r', errors='surrogateescape') as f:
+        for path, flag in iter_linked_files(f):
+            path = os.path.normpath(path)
+            if path in seen:
+                continue
+            seen.add(path)
+            if is_linked_library(path):
+                libraries.append((path, library_flag(path, flag)))
+    return libraries
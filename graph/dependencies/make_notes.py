@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 import json
 import argparse
+import hashlib
+import os
 import sys
+import zlib
 from pathlib import Path
+from urllib.parse import quote
+
+import incremental
+from resolver_cache import default_cache_dir
+
+# key under which a note references a shared dependency manifest instead of inlining the list
+MANIFEST_REF = 'dependencyManifest'
+ZLIB_HEADER = 0x78
+# bump when the notes can come out differently for the same inputs (layout or encoding changes)
+NOTES_FORMAT = 1
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Generate dependency notes from library information')
@@ -17,6 +30,18 @@ def parse_args():
     parser.add_argument('--cpe', help='CPE identifier')
     parser.add_argument('--purl', help='Package URL')
     parser.add_argument('--license', help='License information')
+    parser.add_argument('--os-release', default='/etc/os-release',
+                        help='os-release file used to namespace dependency purls (default: /etc/os-release)')
+    parser.add_argument('--output', default='notes.json', help='notes file to write (default: %(default)s)')
+    parser.add_argument('--compact', action='store_true', help='minified JSON with a stable key order')
+    parser.add_argument('--compress', action='store_true',
+                        help='zlib-compress the compact JSON (embed with embed_notes.py --note-format elf)')
+    parser.add_argument('--manifest-dir',
+                        help='write the dependency list here as a shared manifest and reference it by content hash')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse the previous notes when libs.json and the package metadata are unchanged')
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='directory for incremental results (default: %(default)s)')
 
     return parser.parse_args()
 
@@ -34,6 +59,54 @@ def read_input_file(file_path):
         print(f"Error reading input file: {e}", file=sys.stderr)
         sys.exit(1)
 
+def read_os_release(file_path):
+    """Read the distro ID and VERSION_ID from an os-release file."""
+    release = {}
+    try:
+        with open(file_path, 'r') as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep:
+                    release[key] = value.strip('"\'')
+    except OSError:
+        pass
+    return release
+
+def rpm_purl(lib, distro, release):
+    """Build an rpm purl, moving any epoch into a qualifier and naming the source rpm as the upstream."""
+    epoch, _, version = lib['version'].rpartition(':')
+    qualifiers = [f"arch={lib['arch']}"]
+    if release.get('VERSION_ID'):
+        qualifiers.append(f"distro={distro}-{release['VERSION_ID']}")
+    if epoch:
+        qualifiers.append(f"epoch={epoch}")
+    if lib.get('source'):
+        source_rpm = f"{lib['source']}-{lib.get('source_version') or version}.src.rpm"
+        qualifiers.append(f"upstream={quote(source_rpm)}")
+    return f"pkg:rpm/{distro}/{quote(lib['name'])}@{quote(version, safe='+~')}?{'&'.join(qualifiers)}"
+
+def dependency_purl(lib, release):
+    """Build a deb or rpm purl for a resolved library, carrying its source package as the upstream."""
+    distro = release.get('ID')
+    if not distro or 'arch' not in lib:
+        return None
+
+    if lib['type'] == 'rpm':
+        return rpm_purl(lib, distro, release)
+
+    purl = f"pkg:deb/{distro}/{quote(lib['name'])}@{quote(lib['version'], safe=':+~')}?arch={lib['arch']}"
+
+    source = lib.get('source', lib['name'])
+    source_version = lib.get('source_version', lib['version'])
+    if source_version != lib['version']:
+        purl += f"&upstream={quote(source)}%40{quote(source_version, safe=':+~')}"
+    elif source != lib['name']:
+        purl += f"&upstream={quote(source)}"
+
+    if release.get('VERSION_ID'):
+        purl += f"&distro={distro}-{release['VERSION_ID']}"
+    return purl
+
 def generate_notes(args, libs_data):
     # Build the base notes structure
     notes = {
@@ -53,37 +126,134 @@ def generate_notes(args, libs_data):
         notes["license"] = args.license
 
     # Add dependencies
+    release = read_os_release(args.os_release)
     for lib in libs_data:
         dep = {
             "name": lib["name"],
             "version": lib["version"],
             "type": lib["type"]
         }
+        purl = dependency_purl(lib, release)
+        if purl:
+            dep["purl"] = purl
         notes["dependencies"].append(dep)
 
     return notes
 
-def write_output(notes):
+def compact_json(value):
+    """Minified JSON with sorted keys, so equal notes always encode to the same bytes."""
+    return json.dumps(value, separators=(',', ':'), sort_keys=True, ensure_ascii=False).encode()
+
+def write_manifest(notes, manifest_dir):
+    """Move the dependency list into a content-addressed manifest file shared by every note that uses it."""
+    manifest = compact_json(notes.pop('dependencies'))
+    digest = hashlib.sha256(manifest).hexdigest()
+    path = os.path.join(manifest_dir, f"sha256-{digest}.json")
+    if not os.path.exists(path):
+        os.makedirs(manifest_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(manifest)
+    notes[MANIFEST_REF] = f"sha256:{digest}"
+    return path
+
+def encode_notes(notes, compact=False, compress=False):
+    """Serialize notes: plain JSON as before, compact JSON, or zlib-compressed compact JSON."""
+    if compress:
+        return zlib.compress(compact_json(notes), 9)
+    if compact:
+        return compact_json(notes)
+    return json.dumps(notes).encode()
+
+def is_compressed(payload):
+    """Compressed notes start with a zlib header; JSON notes start with '{' or whitespace."""
+    return bool(payload) and payload[0] == ZLIB_HEADER
+
+def load_manifest(reference, manifest_dir):
+    """Return the dependency list for a sha256:<hex> reference, checking its content against the hash."""
+    algorithm, _, digest = reference.partition(':')
+    path = os.path.join(manifest_dir, f"{algorithm}-{digest}.json")
+    with open(path, 'rb') as f:
+        manifest = f.read()
+    if algorithm != 'sha256' or hashlib.sha256(manifest).hexdigest() != digest:
+        raise ValueError(f"dependency manifest does not match {reference}")
+    return json.loads(manifest)
+
+def decode_notes(payload, compressed=None, manifest_dir=None):
+    """Parse any note payload make_notes.py writes back into the full notes structure.
+
+    compressed comes from the ELF note type when there is one; otherwise it is detected from
+    the payload. A referenced dependency manifest is inlined when manifest_dir is given.
+    """
+    if compressed is None:
+        compressed = is_compressed(payload)
+    if compressed:
+        payload = zlib.decompress(payload)
+    notes = json.loads(payload)
+
+    if manifest_dir and isinstance(notes, dict) and MANIFEST_REF in notes:
+        notes['dependencies'] = load_manifest(notes.pop(MANIFEST_REF), manifest_dir)
+    return notes
+
+def write_output(payload, output='notes.json'):
     try:
-        with open('notes.json', 'w') as f:
-            json.dump(notes, f)
-        print(f"Successfully wrote notes.json", file=sys.stderr)
+        with open(output, 'wb') as f:
+            f.write(payload)
+        print(f"Successfully wrote {output}", file=sys.stderr)
     except Exception as e:
         print(f"Error writing output file: {e}", file=sys.stderr)
         sys.exit(1)
 
+def incremental_key(args):
+    """Content address of everything the notes payload depends on."""
+    return incremental.digest_inputs(
+        'make_notes',
+        NOTES_FORMAT,
+        incremental.file_digest(args.input_file),
+        incremental.file_digest(args.os_release),
+        [args.name, args.version, args.type, args.cpe, args.purl, args.license],
+        [args.compact, args.compress, args.manifest_dir and os.path.abspath(args.manifest_dir)],
+    )
+
+def manifest_available(payload, manifest_dir):
+    """A cached payload that references a dependency manifest is only reusable while the manifest exists."""
+    if not manifest_dir:
+        return True
+    try:
+        load_manifest(decode_notes(payload)[MANIFEST_REF], manifest_dir)
+    except (OSError, ValueError, KeyError, zlib.error):
+        return False
+    return True
+
 def main():
     # Parse command line arguments
     args = parse_args()
 
+    key = None
+    if args.incremental:
+        store = incremental.ResultStore('make_notes', args.cache_dir)
+        key = incremental_key(args)
+        payload = store.load(key)
+        if payload is not None and manifest_available(payload, args.manifest_dir):
+            incremental.report('make_notes', True, key, f"{args.output} is up to date")
+            incremental.write_if_changed(args.output, payload)
+            return
+        incremental.report('make_notes', False, key)
+
     # Read and parse input file
     libs_data = read_input_file(args.input_file)
 
     # Generate notes structure
     notes = generate_notes(args, libs_data)
 
+    if args.manifest_dir:
+        path = write_manifest(notes, args.manifest_dir)
+        print(f"Dependencies referenced from {path}", file=sys.stderr)
+
     # Write output
-    write_output(notes)
+    payload = encode_notes(notes, args.compact, args.compress)
+    write_output(payload, args.output)
+    if key:
+        store.store(key, payload)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+import importlib
+import os
+
+# Package database backends for find_libs.py. Each module provides DB_TYPE (the package
+# type reported in libs.json), database_present(root), database_inputs(root) and
+# load_database(root), which returns an OwnershipIndex of path -> (package, arch) plus a
+# package table of (package, arch) -> {version, architecture, source, source_version, ...}.
+BACKENDS = {
+    'deb': 'dpkg_db',
+    'rpm': 'rpm_db',
+}
+
+# arch of an owner that names its package without an architecture qualifier (dpkg only
+# qualifies Multi-Arch: same packages, e.g. libc6:amd64)
+ANY_ARCH = 'all'
+
+def root_aliases(root='/'):
+    """Map top-level directory symlinks (e.g. usrmerge's /lib -> /usr/lib) to their targets."""
+    aliases = {}
+    try:
+        entries = os.listdir(root)
+    except OSError:
+        return aliases
+
+    for entry in entries:
+        path = os.path.join(root, entry)
+        if not os.path.islink(path):
+            continue
+        target = os.readlink(path)
+        # resolve relative to the root, never the host, so a container rootfs can be indexed too
+        aliases['/' + entry] = os.path.normpath(os.path.join('/', target))
+
+    return aliases
+
+def canonical_path(path, aliases):
+    """Rewrite the leading directory of a path through the root alias map."""
+    head, sep, rest = path[1:].partition('/')
+    alias = aliases.get('/' + head)
+    if alias is None:
+        return path
+    return alias + sep + rest
+
+class OwnershipIndex:
+    """Path to (package, arch) mapping built from a package database in a single pass."""
+
+    def __init__(self, owners=None, aliases=None):
+        self.owners = owners if owners is not None else {}
+        self.aliases = aliases if aliases is not None else {}
+
+    def __len__(self):
+        return len(self.owners)
+
+    def add(self, path, package):
+        """Record a package as the owner of a path (first owner wins, like dpkg -S / rpm -qf output order)."""
+        self.owners.setdefault(path, package)
+        canonical = canonical_path(path, self.aliases)
+        if canonical != path:
+            self.owners.setdefault(canonical, package)
+
+    def lookup(self, path):
+        """Return the owning (package, arch) for an exact path, or None."""
+        return self.owners.get(path)
+
+    def lookup_canonical(self, path):
+        """Return the owning (package, arch) for a path after rewriting symlinked top-level directories."""
+        return self.owners.get(canonical_path(path, self.aliases))
+
+def get_backend(db_type):
+    """Import the backend module for a package type."""
+    if db_type not in BACKENDS:
+        raise ValueError(f"unknown package database type: {db_type} (expected one of {', '.join(BACKENDS)})")
+    return importlib.import_module(BACKENDS[db_type])
+
+def detect_backend(root='/'):
+    """Pick the first backend whose database exists under root, defaulting to dpkg."""
+    for db_type in BACKENDS:
+        backend = get_backend(db_type)
+        if backend.database_present(root):
+            return backend
+    return get_backend('deb')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import hashlib
+import marshal
+import os
+import sys
+
+# bump when the layout of the stored indexes changes
+CACHE_FORMAT = 3
+
+def default_cache_dir():
+    """Where resolver caches live unless told otherwise."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'elf-notes')
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def fingerprint(inputs, hashed=()):
+    """Fingerprint the resolver inputs by mtime/size, plus a content hash for the paths in hashed."""
+    parts = [f"format={CACHE_FORMAT}", f"python={sys.version_info[:2]}"]
+    for path in inputs:
+        parts.append(f"{path}:{_stat_key(path)}")
+    for path in hashed:
+        parts.append(f"{path}#{_file_hash(path)}")
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+def cache_path(cache_dir, name):
+    """Cache file for a given set of inputs (e.g. one per ld cache / root combination)."""
+    digest = hashlib.sha256(name.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"resolver-{digest}.bin")
+
+def load(path, expected_fingerprint):
+    """Return the stored indexes if the cache file matches the fingerprint, otherwise None."""
+    try:
+        # one read then loads(): marshal.load() on a file object issues many small reads
+        with open(path, 'rb') as f:
+            data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if not isinstance(data, dict) or data.get('fingerprint') != expected_fingerprint:
+        return None
+    return data.get('indexes')
+
+def store(path, current_fingerprint, indexes):
+    """Atomically write the indexes (plain dicts/lists/strings only) to the cache file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(marshal.dumps({'fingerprint': current_fingerprint, 'indexes': indexes}))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import struct
+from pathlib import Path
+
+from pkgdb import OwnershipIndex, root_aliases
+
+DB_TYPE = 'rpm'
+
+# newer distros keep the database under /usr, older sqlite-backed ones under /var
+RPMDB_LOCATIONS = [
+    'usr/lib/sysimage/rpm/rpmdb.sqlite',
+    'var/lib/rpm/rpmdb.sqlite',
+]
+
+# header tags and types, see rpm's include/rpm/rpmtag.h
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_ARCH = 1022
+RPMTAG_OLDFILENAMES = 1027
+RPMTAG_SOURCERPM = 1044
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+
+RPM_INT32_TYPE = 4
+RPM_STRING_TYPE = 6
+RPM_STRING_ARRAY_TYPE = 8
+RPM_I18NSTRING_TYPE = 9
+
+WANTED_TAGS = {
+    RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_EPOCH, RPMTAG_ARCH,
+    RPMTAG_OLDFILENAMES, RPMTAG_SOURCERPM, RPMTAG_DIRINDEXES, RPMTAG_BASENAMES, RPMTAG_DIRNAMES,
+}
+
+def find_rpmdb(root='/'):
+    """Return the rpmdb.sqlite path under root, or None."""
+    for location in RPMDB_LOCATIONS:
+        path = os.path.join(root, location)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def parse_header(blob):
+    """Decode the tags we need from an rpm header blob (as stored in the Packages table)."""
+    il, dl = struct.unpack_from('>ii', blob, 0)
+    data_start = 8 + il * 16
+    tags = {}
+    for i in range(il):
+        tag, kind, offset, count = struct.unpack_from('>iIiI', blob, 8 + i * 16)
+        if tag not in WANTED_TAGS:
+            continue
+        start = data_start + offset
+        if kind == RPM_INT32_TYPE:
+            tags[tag] = struct.unpack_from(f'>{count}i', blob, start)
+        elif kind in (RPM_STRING_TYPE, RPM_I18NSTRING_TYPE):
+            tags[tag] = os.fsdecode(blob[start:blob.index(b'\0', start)])
+        elif kind == RPM_STRING_ARRAY_TYPE:
+            end = start
+            for _ in range(count):
+                end = blob.index(b'\0', end) + 1
+            tags[tag] = [os.fsdecode(s) for s in blob[start:end - 1].split(b'\0')] if count else []
+    return tags
+
+def _split_source_rpm(source_rpm):
+    # "glibc-2.41-1.fc42.src.rpm" -> ("glibc", "2.41-1.fc42")
+    nvr = source_rpm[:-len('.src.rpm')] if source_rpm.endswith('.src.rpm') else source_rpm
+    parts = nvr.rsplit('-', 2)
+    if len(parts) != 3:
+        return nvr, ''
+    return parts[0], f"{parts[1]}-{parts[2]}"
+
+def _header_files(tags):
+    if RPMTAG_BASENAMES in tags:
+        dirnames = tags.get(RPMTAG_DIRNAMES, [])
+        dirindexes = tags.get(RPMTAG_DIRINDEXES, [])
+        return [dirnames[i] + base for base, i in zip(tags[RPMTAG_BASENAMES], dirindexes)]
+    return tags.get(RPMTAG_OLDFILENAMES, [])
+
+def _connect(path):
+    uri = Path(os.path.abspath(path)).as_uri()
+    try:
+        db = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+        db.execute('SELECT 1 FROM Packages LIMIT 1')
+        return db
+    except sqlite3.OperationalError:
+        # a WAL database without a writable -shm can't be opened read-only; treat it as a snapshot
+        return sqlite3.connect(f"{uri}?immutable=1", uri=True)
+
+def load_database(root='/'):
+    """Load the (ownership index, package table) pair straight from rpmdb.sqlite, without rpm -qf."""
+    owners = OwnershipIndex(aliases=root_aliases(root))
+    packages = {}
+
+    path = find_rpmdb(root)
+    if not path:
+        return owners, packages
+
+    db = _connect(path)
+    try:
+        rows = db.execute('SELECT blob FROM Packages ORDER BY hnum')
+        for blob, in rows:
+            tags = parse_header(blob)
+            name = tags.get(RPMTAG_NAME)
+            # the gpg-pubkey pseudo-packages carry no files
+            if not name or name == 'gpg-pubkey':
+                continue
+
+            version = f"{tags.get(RPMTAG_VERSION, '')}-{tags.get(RPMTAG_RELEASE, '')}"
+            epoch = tags.get(RPMTAG_EPOCH)
+            epoch = epoch[0] if epoch else None
+            # an epoch of 0 is the same as none, and rpm leaves it out of the version too
+            if epoch:
+                version = f"{epoch}:{version}"
+            source, source_version = _split_source_rpm(tags.get(RPMTAG_SOURCERPM, '') or name)
+
+            # multilib packages (glibc.i686 next to glibc.x86_64) share a name
+            arch = tags.get(RPMTAG_ARCH, '')
+            packages.setdefault((name, arch), {
+                'version': version,
+                'architecture': arch,
+                'source': source,
+                'source_version': source_version or version,
+                'epoch': epoch,
+                'source_rpm': tags.get(RPMTAG_SOURCERPM, ''),
+            })
+
+            for file_path in _header_files(tags):
+                owners.add(file_path, (name, arch))
+    finally:
+        db.close()
+
+    return owners, packages
+
+def database_present(root='/'):
+    """Whether root has a sqlite rpm database."""
+    return find_rpmdb(root) is not None
+
+def database_inputs(root='/'):
+    """Files whose change invalidates indexes built from this database: (stat only, content hashed)."""
+    path = find_rpmdb(root) or os.path.join(root, RPMDB_LOCATIONS[0])
+    return [path, path + '-wal'], []
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import stat
+import sys
+import tarfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from embed_notes import ELF_MAGIC, NOTE_SECTION, ElfError, note_payload, read_elf, section_data
+from image_notes import scan_image
+from make_notes import decode_notes
+
+# paths handed to a worker at a time; small files make per-path IPC the dominant cost otherwise
+CHUNK_SIZE = 256
+
+def walk_files(root):
+    """Yield every regular file under root without following symlinks, in a stable order."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                mode = entry.stat(follow_symlinks=False).st_mode
+            except OSError:
+                continue
+            if stat.S_ISDIR(mode):
+                subdirs.append(entry.path)
+            elif stat.S_ISREG(mode):
+                yield entry.path
+        stack.extend(reversed(subdirs))
+
+def read_note(path, section=NOTE_SECTION):
+    """Return (is_elf, (payload, compressed) or None) for one file."""
+    with open(path, 'rb') as f:
+        # most of a rootfs is not ELF; four bytes are enough to skip it without mapping anything
+        if f.read(4) != ELF_MAGIC:
+            return False, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            elf = read_elf(data)
+            contents = section_data(data, elf, section)
+            if contents is None:
+                return True, None
+            return True, note_payload(contents, elf['endian'])
+
+def scan_file(path, root, section=NOTE_SECTION, include_missing=False, manifest_dir=None):
+    """One JSONL record for a file: its decoded note, a decode error, or None to skip it."""
+    name = '/' + os.path.relpath(path, root)
+    try:
+        elf, note = read_note(path, section)
+    except (OSError, ValueError, ElfError) as e:
+        return {'path': name, 'error': str(e)}
+
+    if note is None:
+        return {'path': name, 'note': None} if include_missing and elf else None
+    return note_record({'path': name}, note, manifest_dir)
+
+def note_record(record, note, manifest_dir=None):
+    """Add the decoded note (or why it could not be decoded) to a JSONL record."""
+    payload, compressed = note
+    try:
+        record['note'] = decode_notes(payload, compressed, manifest_dir)
+    except (OSError, ValueError, zlib.error) as e:
+        record['error'] = f"invalid note: {e}"
+    return record
+
+def _scan_chunk(job):
+    paths, root, section, include_missing, manifest_dir = job
+    records = []
+    for path in paths:
+        record = scan_file(path, root, section, include_missing, manifest_dir)
+        if record is not None:
+            records.append(record)
+    return records
+
+def _chunks(paths, size):
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def scan_tree(root, out, section=NOTE_SECTION, include_missing=False, jobs=None, manifest_dir=None):
+    """Scan every file under root across a process pool, writing one JSON line per note found."""
+    work = ((chunk, root, section, include_missing, manifest_dir) for chunk in _chunks(walk_files(root), CHUNK_SIZE))
+    found = 0
+
+    if jobs == 1:
+        results = map(_scan_chunk, work)
+        pool = None
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=context)
+        results = pool.map(_scan_chunk, work)
+
+    try:
+        for records in results:
+            for record in records:
+                out.write(json.dumps(record) + '\n')
+                found += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return found
+
+def scan_image_archive(tar_path, out, section=NOTE_SECTION, include_missing=False, manifest_dir=None):
+    """Write one JSON line per note in a docker save / OCI image archive, streaming it once."""
+    found = 0
+    for image, path, kind, value in scan_image(tar_path, section, include_missing):
+        record = {'image': image, 'path': path}
+        if kind == 'note':
+            note_record(record, value, manifest_dir)
+        elif kind == 'missing':
+            record['note'] = None
+        else:
+            record['error'] = value
+        out.write(json.dumps(record) + '\n')
+        found += 1
+    return found
+
+def scan(args, out):
+    if os.path.isfile(args.root):
+        return scan_image_archive(args.root, out, args.section, args.include_missing, args.manifest_dir)
+    return scan_tree(args.root, out, args.section, args.include_missing, args.jobs, args.manifest_dir)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='List the package notes embedded in the ELF files under a directory')
+    parser.add_argument('root', help='directory tree to scan (an unpacked rootfs or build output), '
+                                     'or a `docker save` / OCI image archive to stream')
+    parser.add_argument('--section', default=NOTE_SECTION, help='note section name (default: %(default)s)')
+    parser.add_argument('--include-missing', action='store_true', help='also list ELF files without a note')
+    parser.add_argument('--manifest-dir', help='resolve notes that reference a shared dependency manifest from here')
+    parser.add_argument('--output', help='JSON Lines output file (default: stdout)')
+    parser.add_argument('--jobs', type=int,
+                        help='worker processes for a directory scan (default: CPU count; 1 scans inline)')
+    args = parser.parse_args()
+    if args.jobs is not None and os.path.isfile(args.root):
+        parser.error("--jobs only applies to directory scans; an image archive is streamed in a single pass")
+    return args
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.root):
+        print(f"Error: no such file or directory: {args.root}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if args.output:
+            with open(args.output, 'w') as out:
+                found = scan(args, out)
+        else:
+            found = scan(args, sys.stdout)
+    except (tarfile.TarError, ValueError, KeyError) as e:
+        print(f"Error reading image archive {args.root}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Found {found} records under {args.root}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+from graphviz import Digraph
+from sbom_export import WRITERS
+from sbom_graph import FILE, PACKAGE, NodeTable, Relationships
+from show import read_graph
+
+SECTIONS = ('added', 'removed', 'changed', 'added_edges', 'removed_edges')
+STATUS_MARKS = {'added': '+', 'removed': '-', 'changed': '~', 'same': ' '}
+STATUS_COLORS = {'added': 'palegreen', 'removed': 'lightpink', 'changed': 'khaki', 'same': 'white'}
+EDGE_COLORS = {'added': 'darkgreen', 'removed': 'red', 'same': 'gray'}
+
+class GraphKeys:
+    """One SBOM graph reduced to hashable identities: nodes by get_node_key and edges by key triple."""
+
+    def __init__(self, nodes, relationships):
+        self.types = dict(zip(nodes.keys, nodes.types))
+        keys = nodes.keys
+        self.edges = {(keys[parent], keys[child], rel_type) for parent, child, rel_type in relationships}
+
+def _describe(key):
+    if key[0] == 'pkg':
+        return {'kind': 'package', 'name': key[1], 'version': key[2]}
+    return {'kind': 'file', 'path': key[1]}
+
+def _describe_edge(edge):
+    parent, child, rel_type = edge
+    return {'parent': _describe(parent), 'child': _describe(child), 'type': rel_type}
+
+def _name(key):
+    return f"{key[1]}@{key[2]}" if key[0] == 'pkg' else key[1]
+
+def diff_graphs(old, new):
+    """Compare two GraphKeys in one pass over each side's nodes and edges.
+
+    A package that appears with exactly one version on each side (and no other) counts as changed
+    rather than removed and added, and its edges are compared under its new key, so a version bump
+    does not also show up as every one of its relationships being replaced.
+    """
+    added = [key for key in new.types if key not in old.types]
+    removed = [key for key in old.types if key not in new.types]
+    changed = [(key, key) for key in new.types if key in old.types and old.types[key] != new.types[key]]
+
+    old_versions = defaultdict(list)
+    for key in old.types:
+        if key[0] == 'pkg':
+            old_versions[key[1]].append(key)
+    new_versions = defaultdict(list)
+    for key in new.types:
+        if key[0] == 'pkg':
+            new_versions[key[1]].append(key)
+    renamed = {}
+    for name, keys in old_versions.items():
+        # with more versions on either side there is no telling which one became which
+        if len(keys) == 1 and len(new_versions.get(name, ())) == 1 and keys[0] != new_versions[name][0]:
+            renamed[keys[0]] = new_versions[name][0]
+            changed.append((keys[0], new_versions[name][0]))
+    bumped = set(renamed.values())
+    added = [key for key in added if key not in bumped]
+    removed = [key for key in removed if key not in renamed]
+
+    old_edges = {(renamed.get(parent, parent), renamed.get(child, child), rel_type)
+                 for parent, child, rel_type in old.edges}
+    return {
+        'added': sorted(added),
+        'removed': sorted(removed),
+        'changed': sorted(changed, key=lambda pair: pair[1]),
+        'added_edges': sorted(new.edges - old_edges),
+        'removed_edges': sorted(old_edges - new.edges),
+        'renamed': renamed,
+    }
+
+def report(diff, old, new):
+    """The differences as a JSON-friendly dict."""
+    changed = []
+    for old_key, new_key in diff['changed']:
+        entry = _describe(new_key)
+        if old_key != new_key:
+            entry['from_version'] = old_key[2]
+        else:
+            entry['from_type'] = old.types[old_key]
+            entry['to_type'] = new.types[new_key]
+        changed.append(entry)
+    return {
+        'summary': {name: len(diff[name]) for name in SECTIONS},
+        'added': [_describe(key) for key in diff['added']],
+        'removed': [_describe(key) for key in diff['removed']],
+        'changed': changed,
+        'added_edges': [_describe_edge(edge) for edge in diff['added_edges']],
+        'removed_edges': [_describe_edge(edge) for edge in diff['removed_edges']],
+    }
+
+def print_text(diff, old, new):
+    summary = {name: len(diff[name]) for name in SECTIONS}
+    print(f"nodes: +{summary['added']} -{summary['removed']} ~{summary['changed']}  "
+          f"edges: +{summary['added_edges']} -{summary['removed_edges']}")
+    for key in diff['added']:
+        print(f"+ {_describe(key)['kind']} {_name(key)}")
+    for key in diff['removed']:
+        print(f"- {_describe(key)['kind']} {_name(key)}")
+    for old_key, new_key in diff['changed']:
+        if old_key != new_key:
+            print(f"~ package {new_key[1]} {old_key[2]} -> {new_key[2]}")
+        else:
+            print(f"~ {_describe(new_key)['kind']} {_name(new_key)} type {old.types[old_key]!r} -> {new.types[new_key]!r}")
+    for parent, child, rel_type in diff['added_edges']:
+        print(f"+ edge {_name(parent)} -> {_name(child)} ({rel_type})")
+    for parent, child, rel_type in diff['removed_edges']:
+        print(f"- edge {_name(parent)} -> {_name(child)} ({rel_type})")
+
+def neighbourhood_graph(diff, old, new, depth=1):
+    """The differing nodes and edges plus depth edges of unchanged context, as (nodes, edges, statuses).
+
+    statuses maps node ids and (parent, child, type) edges of the result to added/removed/changed/same.
+    """
+    previous = {new_key: old_key for old_key, new_key in diff['renamed'].items()}
+    status = {}
+    for key in diff['added']:
+        status[key] = 'added'
+    for key in diff['removed']:
+        status[key] = 'removed'
+    for _, key in diff['changed']:
+        status[key] = 'changed'
+
+    # the union of both graphs, with old package keys moved onto their new version
+    edge_status = {edge: 'same' for edge in new.edges}
+    for edge in diff['added_edges']:
+        edge_status[edge] = 'added'
+    for edge in diff['removed_edges']:
+        edge_status[edge] = 'removed'
+    around = defaultdict(list)
+    for parent, child, _ in edge_status:
+        around[parent].append(child)
+        around[child].append(parent)
+
+    keep = set(status)
+    for parent, child, _ in diff['added_edges'] + diff['removed_edges']:
+        keep.update((parent, child))
+    frontier = list(keep)
+    for _ in range(depth):
+        reached = []
+        for key in frontier:
+            for other in around[key]:
+                if other not in keep:
+                    keep.add(other)
+                    reached.append(other)
+        frontier = reached
+
+    nodes = NodeTable()
+    statuses = {}
+    for key in sorted(keep):
+        mark = STATUS_MARKS[status.get(key, 'same')]
+        kind = PACKAGE if key[0] == 'pkg' else FILE
+        label = f"{mark} {key[1]}\n{key[2]}" if kind == PACKAGE else f"{mark} {key[1]}"
+        if key in previous:
+            label = f"{mark} {key[1]}\n{previous[key][2]} -> {key[2]}"
+        node_type = new.types.get(key, old.types.get(key, ''))
+        node = nodes.add(key, kind, f"n{len(nodes)}", label, node_type)
+        statuses[node] = status.get(key, 'same')
+
+    edges = Relationships()
+    for (parent, child, rel_type), state in edge_status.items():
+        if parent in keep and child in keep and (state != 'same' or parent in status or child in status):
+            edges.add(nodes.lookup(parent), nodes.lookup(child), rel_type)
+            statuses[(nodes.lookup(parent), nodes.lookup(child), rel_type)] = state
+    return nodes, edges, statuses
+
+def to_digraph(nodes, edges, statuses):
+    dot = Digraph(comment='SBOM Diff')
+    dot.attr(rankdir='LR')
+    dot.attr('node', fontname='Arial')
+    for node in range(len(nodes)):
+        dot.node(nodes.names[node], nodes.labels[node],
+                shape='box' if nodes.kinds[node] == PACKAGE else 'ellipse',
+                style='filled',
+                fillcolor=STATUS_COLORS[statuses[node]],
+                tooltip=f"Type: {nodes.types[node]}")
+    for parent, child, rel_type in edges:
+        state = statuses[(parent, child, rel_type)]
+        dot.edge(nodes.names[parent], nodes.names[child],
+                label=rel_type,
+                tooltip=rel_type,
+                color=EDGE_COLORS[state],
+                style='dashed' if state == 'removed' else 'solid')
+    return dot
+
+def render(diff, old, new, output, depth):
+    nodes, edges, statuses = neighbourhood_graph(diff, old, new, depth)
+    output = os.path.abspath(output)
+    base, extension = os.path.splitext(output)
+    output_format = extension.lstrip('.') or 'png'
+    if output_format in WRITERS:
+        with open(output, 'w') as f:
+            WRITERS[output_format](nodes, edges, f)
+    else:
+        rendered = to_digraph(nodes, edges, statuses).render(base, format=output_format, cleanup=True)
+        if rendered != output:
+            os.replace(rendered, output)
+    print(f"Rendered {len(nodes)} nodes and {len(edges)} edges to {output}", file=sys.stderr)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare the package and file graphs of two syft JSON SBOMs')
+    parser.add_argument('old', help='baseline SBOM')
+    parser.add_argument('new', help='SBOM to compare against it')
+    parser.add_argument('--json', action='store_true', help='print the differences as one JSON document')
+    parser.add_argument('--render', metavar='FILE',
+                        help='also draw only what differs plus its neighbours; the extension picks the format '
+                             '(png/svg via Graphviz, or graphml/json/html)')
+    parser.add_argument('--depth', type=int, default=1, help='edges of unchanged context around differences to render (default: 1)')
+    parser.add_argument('--exit-code', action='store_true', help='exit with status 1 when the graphs differ')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show the graph build log')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    old = GraphKeys(*read_graph(args.old, reduce=False, verbose=args.verbose))
+    new = GraphKeys(*read_graph(args.new, reduce=False, verbose=args.verbose))
+    diff = diff_graphs(old, new)
+
+    if args.json:
+        print(json.dumps(report(diff, old, new), indent=2))
+    else:
+        print_text(diff, old, new)
+    if args.render:
+        render(diff, old, new, args.render, args.depth)
+
+    if args.exit_code and any(diff[name] for name in SECTIONS):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import sys
+from array import array
+from collections import deque
+
+from sbom_export import KIND_NAMES
+from sbom_graph import PACKAGE, build_adjacency, strongly_connected_components
+from show import read_graph
+
+# bump when the layout of the stored index changes
+INDEX_FORMAT = 1
+READ_CHUNK = 1024 * 1024
+# bytes of reachability bitsets kept per direction before falling back to walking the condensed graph
+BITSET_BUDGET = 64 * 1024 * 1024
+
+# relationship types whose parent is what the child needs, e.g. "openssl dependency-of curl";
+# every other type (contains, ...) already points from the thing to what it pulls in
+REVERSED_TYPES = {'dependency-of', 'evident-by'}
+
+def default_index_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'elf-notes', 'sbom-index')
+
+def sbom_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _bits(value):
+    """Positions of the set bits of an int (one pass over its binary digits, lowest first)."""
+    digits = bin(value)[:1:-1]
+    positions = []
+    position = digits.find('1')
+    while position >= 0:
+        positions.append(position)
+        position = digits.find('1', position + 1)
+    return positions
+
+def _closure(order, offsets, targets, numbering, budget):
+    """Per-component bitsets of everything reachable along a condensed CSR graph, or None over budget.
+
+    order must visit each component after everything it points at.
+    """
+    bit = {c: i for i, c in enumerate(numbering)}
+    closure = [0] * (len(offsets) - 1)
+    size = 0
+    for c in order:
+        bits = 0
+        for target in targets[offsets[c]:offsets[c + 1]]:
+            bits |= closure[target] | 1 << bit[target]
+        closure[c] = bits
+        size += bits.bit_length() // 8
+        if size > budget:
+            return None
+    return closure
+
+def _walk(starts, offsets, targets):
+    """Components reachable from starts along a condensed CSR graph (starts excluded)."""
+    seen = set()
+    stack = list(starts)
+    while stack:
+        c = stack.pop()
+        for target in targets[offsets[c]:offsets[c + 1]]:
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+class ReachabilityIndex:
+    """Which nodes of an SBOM graph reach which, answerable without walking the graph.
+
+    Edges point from a node to what it pulls in (see REVERSED_TYPES). The graph is condensed into
+    strongly connected components, and every component keeps an int bitset of the components it
+    reaches and one of the components that reach it. Only components with a predecessor can be
+    reached and only those with a successor can reach anything, so each bitset is numbered over
+    those alone: for a typical image SBOM the many files never need a bit of the second kind.
+    A deep chain makes the bitsets quadratic, so past BITSET_BUDGET a direction keeps only the
+    condensed graph and queries walk it instead.
+    """
+
+    COLUMNS = ('offsets', 'targets', 'component_of', 'down_offsets', 'down_targets', 'up_offsets',
+               'up_targets', 'reached', 'reaching')
+
+    def __init__(self, data):
+        self.keys = data['keys']
+        self.kinds = data['kinds']
+        for column in self.COLUMNS:
+            setattr(self, column, array('l', data[column]))
+        self.descendants = data['descendants']
+        self.ancestors = data['ancestors']
+
+        self.reached_bit = {c: i for i, c in enumerate(self.reached)}
+        self.members = [[] for _ in range(len(self.down_offsets) - 1)]
+        for node, component in enumerate(self.component_of):
+            self.members[component].append(node)
+        self.by_name = {}
+        for node, key in enumerate(self.keys):
+            self.by_name.setdefault(key[1], []).append(node)
+            if self.kinds[node] == PACKAGE:
+                self.by_name.setdefault(f"{key[1]}@{key[2]}", []).append(node)
+
+    @classmethod
+    def build(cls, nodes, relationships, budget=None):
+        budget = BITSET_BUDGET if budget is None else budget
+        parents = array('l')
+        children = array('l')
+        for parent, child, rel_type in relationships:
+            if rel_type in REVERSED_TYPES:
+                parent, child = child, parent
+            parents.append(parent)
+            children.append(child)
+        offsets, targets = build_adjacency(len(nodes), parents, children)
+        component_of, components = strongly_connected_components(offsets, targets)
+
+        count = len(components)
+        sources = array('l')
+        sinks = array('l')
+        for node in range(len(nodes)):
+            for child in targets[offsets[node]:offsets[node + 1]]:
+                if component_of[child] != component_of[node]:
+                    sources.append(component_of[node])
+                    sinks.append(component_of[child])
+        down_offsets, down_targets = build_adjacency(count, sources, sinks)
+        up_offsets, up_targets = build_adjacency(count, sinks, sources)
+
+        # bit numbering: reached[i] / reaching[i] is the component behind bit i
+        reached = array('l', (c for c in range(count) if up_offsets[c + 1] > up_offsets[c]))
+        reaching = array('l', (c for c in range(count) if down_offsets[c + 1] > down_offsets[c]))
+        # components come sinks first, so edges always point to a lower number
+        descendants = _closure(range(count), down_offsets, down_targets, reached, budget)
+        ancestors = _closure(reversed(range(count)), up_offsets, up_targets, reaching, budget)
+
+        return cls({
+            'keys': list(nodes.keys),
+            'kinds': bytes(nodes.kinds),
+            'offsets': offsets,
+            'targets': targets,
+            'component_of': component_of,
+            'down_offsets': down_offsets,
+            'down_targets': down_targets,
+            'up_offsets': up_offsets,
+            'up_targets': up_targets,
+            'reached': reached,
+            'reaching': reaching,
+            'descendants': descendants,
+            'ancestors': ancestors,
+        })
+
+    def dump(self):
+        data = {column: getattr(self, column).tobytes() for column in self.COLUMNS}
+        data.update({
+            'format': INDEX_FORMAT,
+            'keys': self.keys,
+            'kinds': self.kinds,
+            'descendants': self.descendants,
+            'ancestors': self.ancestors,
+        })
+        return marshal.dumps(data)
+
+    @classmethod
+    def load(cls, data):
+        data = marshal.loads(data)
+        if not isinstance(data, dict) or data.get('format') != INDEX_FORMAT:
+            return None
+        return cls(data)
+
+    def find(self, name):
+        """Nodes for a package name, name@version or file path."""
+        nodes = self.by_name.get(name)
+        if not nodes:
+            raise KeyError(name)
+        return nodes
+
+    def describe(self, node):
+        key = self.keys[node]
+        name = f"{key[1]}@{key[2]}" if self.kinds[node] == PACKAGE else key[1]
+        return {'kind': KIND_NAMES[self.kinds[node]], 'name': name}
+
+    def _expand(self, sources, upward):
+        """Nodes reachable from sources (or that reach them, upward), sources excluded."""
+        if upward:
+            closure, numbering, offsets, targets = self.ancestors, self.reaching, self.up_offsets, self.up_targets
+        else:
+            closure, numbering, offsets, targets = self.descendants, self.reached, self.down_offsets, self.down_targets
+        starts = {self.component_of[node] for node in sources}
+        if closure is not None:
+            bits = 0
+            for c in starts:
+                bits |= closure[c]
+            components = [numbering[position] for position in _bits(bits)]
+        else:
+            components = _walk(starts, offsets, targets)
+
+        found = set()
+        for c in starts:
+            # the rest of a cycle is on both sides of every node in it
+            if len(self.members[c]) > 1:
+                found.update(self.members[c])
+        for c in components:
+            found.update(self.members[c])
+        found.difference_update(sources)
+        return sorted(found)
+
+    def dependents(self, name):
+        """Everything that pulls in name, directly or transitively."""
+        return self._expand(self.find(name), upward=True)
+
+    def pulls(self, name):
+        """Everything name pulls in, directly or transitively."""
+        return self._expand(self.find(name), upward=False)
+
+    def _may_reach(self, source, target):
+        source, target = self.component_of[source], self.component_of[target]
+        if source == target or self.descendants is None:
+            return True
+        bit = self.reached_bit.get(target)
+        return bit is not None and bool(self.descendants[source] >> bit & 1)
+
+    def path(self, source_name, target_name):
+        """A shortest chain of nodes from source to target, or None when source does not reach it."""
+        sources = self.find(source_name)
+        targets = set(self.find(target_name))
+        if not any(self._may_reach(s, t) for s in sources for t in targets):
+            return None
+        previous = {node: None for node in sources}
+        queue = deque(sources)
+        while queue:
+            node = queue.popleft()
+            if node in targets:
+                chain = []
+                while node is not None:
+                    chain.append(node)
+                    node = previous[node]
+                return chain[::-1]
+            for child in self.targets[self.offsets[node]:self.offsets[node + 1]]:
+                if child not in previous:
+                    previous[child] = node
+                    queue.append(child)
+        return None
+
+def load_index(sbom_file, index_dir=None, verbose=False):
+    """The index for an SBOM, read from index_dir when one was stored for the same content."""
+    index_dir = index_dir or default_index_dir()
+    path = os.path.join(index_dir, f"{sbom_digest(sbom_file)}.idx")
+    try:
+        with open(path, 'rb') as f:
+            index = ReachabilityIndex.load(f.read())
+        if index is not None:
+            return index
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+
+    nodes, relationships = read_graph(sbom_file, reduce=False, verbose=verbose)
+    index = ReachabilityIndex.build(nodes, relationships)
+
+    os.makedirs(index_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(index.dump())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return index
+
+def run_query(index, query, names):
+    """One result record per queried name."""
+    if query == 'path':
+        chain = index.path(*names)
+        return [{'query': query, 'from': names[0], 'to': names[1],
+                 'path': [index.describe(node) for node in chain] if chain else None}]
+
+    method = index.dependents if query == 'dependents' else index.pulls
+    records = []
+    for name in names:
+        record = {'query': query, 'package': name}
+        try:
+            record['results'] = [index.describe(node) for node in method(name)]
+        except KeyError:
+            record['error'] = 'not in the SBOM'
+        records.append(record)
+    return records
+
+def print_text(record):
+    if record['query'] == 'path':
+        chain = record['path']
+        print(' -> '.join(item['name'] for item in chain) if chain
+              else f"{record['from']} does not pull in {record['to']}")
+        return
+    if 'error' in record:
+        print(f"{record['package']}: {record['error']}")
+        return
+    print(f"{record['package']}: {len(record['results'])} {record['query']}")
+    for item in record['results']:
+        print(f"  {item['kind']:<8} {item['name']}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Query what depends on, or is pulled in by, packages in an SBOM')
+    parser.add_argument('sbom_file', help='syft JSON SBOM')
+    parser.add_argument('query', choices=['dependents', 'pulls', 'path'],
+                        help='dependents: what pulls in each package; pulls: what each package pulls in; '
+                             'path: a shortest chain from the first package to the second')
+    parser.add_argument('names', nargs='*', help='package names, name@version or file paths')
+    parser.add_argument('--batch', metavar='FILE', help='also query every name listed in FILE (one per line)')
+    parser.add_argument('--json', action='store_true', help='print one JSON record per query')
+    parser.add_argument('--index-dir', help=f"where indexes are kept (default: {default_index_dir()})")
+    parser.add_argument('-v', '--verbose', action='store_true', help='show the graph build log when indexing')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    names = list(args.names)
+    if args.batch:
+        with open(args.batch) as f:
+            names += [line.strip() for line in f if line.strip()]
+    if args.query == 'path' and len(names) != 2:
+        print("Error: path takes exactly two names", file=sys.stderr)
+        sys.exit(1)
+    if not names:
+        print("Error: nothing to query", file=sys.stderr)
+        sys.exit(1)
+
+    index = load_index(args.sbom_file, args.index_dir, args.verbose)
+    try:
+        records = run_query(index, args.query, names)
+    except KeyError as e:
+        print(f"Error: {e.args[0]} is not in {args.sbom_file}", file=sys.stderr)
+        sys.exit(1)
+    for record in records:
+        if args.json:
+            print(json.dumps(record))
+        else:
+            print_text(record)
+
+if __name__ == "__main__":
+    main()
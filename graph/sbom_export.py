@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Write a reduced SBOM graph as GraphML, JSON node-link data or a self-contained HTML viewer."""
+import json
+from xml.sax.saxutils import escape
+
+from sbom_graph import FILE, PACKAGE, SUMMARY
+
+KIND_NAMES = {PACKAGE: 'package', FILE: 'file', SUMMARY: 'summary'}
+
+def write_graphml(nodes, edges, f):
+    """GraphML with label/kind/type attributes on nodes and the relationship type on edges."""
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+            '  <key id="kind" for="node" attr.name="kind" attr.type="string"/>\n'
+            '  <key id="type" for="node" attr.name="type" attr.type="string"/>\n'
+            '  <key id="relationship" for="edge" attr.name="type" attr.type="string"/>\n'
+            '  <graph id="sbom" edgedefault="directed">\n')
+    for node in range(len(nodes)):
+        f.write(f'    <node id="n{node}">'
+                f'<data key="label">{escape(nodes.labels[node])}</data>'
+                f'<data key="kind">{KIND_NAMES[nodes.kinds[node]]}</data>'
+                f'<data key="type">{escape(nodes.types[node])}</data></node>\n')
+    for parent, child, rel_type in edges:
+        f.write(f'    <edge source="n{parent}" target="n{child}">'
+                f'<data key="relationship">{escape(rel_type)}</data></edge>\n')
+    f.write('  </graph>\n</graphml>\n')
+
+def write_node_link(nodes, edges, f):
+    """JSON in the node-link layout d3 and networkx.node_link_graph read (nodes keyed by index)."""
+    data = {
+        'directed': True,
+        'multigraph': False,
+        'graph': {},
+        'nodes': [{'id': node, 'label': nodes.labels[node], 'kind': KIND_NAMES[nodes.kinds[node]],
+                   'type': nodes.types[node]} for node in range(len(nodes))],
+        'links': [{'source': parent, 'target': child, 'type': rel_type} for parent, child, rel_type in edges],
+    }
+    json.dump(data, f)
+
+def _viewer_data(nodes, edges):
+    children = [[] for _ in range(len(nodes))]
+    for parent, child, type_id in zip(edges.parents, edges.children, edges.types):
+        children[parent].append([child, type_id])
+
+    # every node has to be reachable from some root, including nodes that only sit on cycles
+    has_parent = bytearray(len(nodes))
+    for child in edges.children:
+        has_parent[child] = 1
+    starts = [node for node in range(len(nodes)) if not has_parent[node]]
+    starts += [node for node in range(len(nodes)) if has_parent[node]]
+    seen = bytearray(len(nodes))
+    roots = []
+    for start in starts:
+        if seen[start]:
+            continue
+        roots.append(start)
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if not seen[node]:
+                seen[node] = 1
+                stack.extend(child for child, _ in children[node])
+
+    return {
+        'labels': nodes.labels,
+        'kinds': [KIND_NAMES[kind] for kind in nodes.kinds],
+        'types': nodes.types,
+        'children': children,
+        'relationships': edges.type_names,
+        'roots': roots,
+    }
+
+VIEWER = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { font-family: Arial, sans-serif; font-size: 14px; margin: 1em; }
+ul { list-style: none; padding-left: 1.4em; margin: 0; }
+li > span { cursor: pointer; padding: 1px 4px; border-radius: 3px; white-space: pre; }
+.package { background: lightblue; }
+.file { background: lightgreen; }
+.summary { background: #eee; font-style: italic; }
+.rel, .count { color: gray; font-size: 12px; }
+.toggle { display: inline-block; width: 1em; color: gray; }
+#filter { width: 30em; margin-bottom: 1em; }
+</style>
+</head>
+<body>
+<input id="filter" placeholder="show only top-level entries containing...">
+<ul id="tree"></ul>
+<script>
+const graph = %(data)s;
+
+// children are only turned into elements when their parent is first expanded
+function item(node, relationship) {
+  const li = document.createElement('li');
+  const kids = graph.children[node];
+  const toggle = document.createElement('span');
+  toggle.className = 'toggle';
+  toggle.textContent = kids.length ? '\\u25b8' : '';
+  const label = document.createElement('span');
+  label.className = graph.kinds[node];
+  label.textContent = graph.labels[node].replace(/\\n/g, ' ');
+  label.title = graph.types[node] ? 'Type: ' + graph.types[node] : '';
+  li.append(toggle, label);
+  if (relationship !== undefined) {
+    li.append(' ', Object.assign(document.createElement('span'), {className: 'rel', textContent: graph.relationships[relationship]}));
+  }
+  if (kids.length) {
+    li.append(' ', Object.assign(document.createElement('span'), {className: 'count', textContent: '(' + kids.length + ')'}));
+  }
+  let list = null;
+  const flip = () => {
+    if (!kids.length) return;
+    if (!list) {
+      list = document.createElement('ul');
+      for (const [child, rel] of kids) list.append(item(child, rel));
+      li.append(list);
+    } else {
+      list.hidden = !list.hidden;
+    }
+    toggle.textContent = list.hidden ? '\\u25b8' : '\\u25be';
+  };
+  toggle.onclick = flip;
+  label.onclick = flip;
+  return li;
+}
+
+function show(filter) {
+  const tree = document.getElementById('tree');
+  tree.replaceChildren();
+  const needle = filter.toLowerCase();
+  for (const root of graph.roots) {
+    if (!needle || graph.labels[root].toLowerCase().includes(needle)) tree.append(item(root));
+  }
+}
+
+document.getElementById('filter').oninput = (e) => show(e.target.value);
+show('');
+</script>
+</body>
+</html>
+'''
+
+def write_html(nodes, edges, f, title='SBOM'):
+    """A single HTML file with the graph embedded as JSON and a tree that expands on click."""
+    data = json.dumps(_viewer_data(nodes, edges), separators=(',', ':'))
+    # keep the embedded data from closing the script element early
+    data = data.replace('</', '<\\/')
+    f.write(VIEWER % {'title': escape(title), 'data': data})
+
+WRITERS = {
+    'graphml': write_graphml,
+    'json': write_node_link,
+    'html': write_html,
+}
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""Integer-indexed SBOM graph: interned nodes, relationship arrays, CSR adjacency and edge reduction."""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+PACKAGE = 0
+FILE = 1
+# stands in for nodes hidden by a summary (e.g. "+12 more")
+SUMMARY = 2
+
+class NodeTable:
+    """Deduplicated nodes: each distinct key gets the next dense integer id; attributes are parallel columns."""
+    __slots__ = ('ids', 'keys', 'kinds', 'names', 'labels', 'types')
+
+    def __init__(self):
+        self.ids = {}
+        self.keys = []
+        self.kinds = array('B')
+        self.names = []
+        self.labels = []
+        self.types = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, key):
+        return self.ids.get(key)
+
+    def add(self, key, kind, name, label, node_type=''):
+        node = len(self.keys)
+        self.ids[key] = node
+        self.keys.append(key)
+        self.kinds.append(kind)
+        self.names.append(name)
+        self.labels.append(label)
+        self.types.append(node_type)
+        return node
+
+    def count(self, kind):
+        return self.kinds.count(kind)
+
+class Relationships:
+    """Relationships between node ids in SBOM order, with their type names interned."""
+    __slots__ = ('parents', 'children', 'types', 'type_ids', 'type_names')
+
+    def __init__(self):
+        self.parents = array('l')
+        self.children = array('l')
+        self.types = array('l')
+        self.type_ids = {}
+        self.type_names = []
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __iter__(self):
+        """Yield (parent, child, type name) triples."""
+        names = self.type_names
+        for parent, child, type_id in zip(self.parents, self.children, self.types):
+            yield parent, child, names[type_id]
+
+    def add(self, parent, child, rel_type):
+        type_id = self.type_ids.get(rel_type)
+        if type_id is None:
+            type_id = self.type_ids[rel_type] = len(self.type_names)
+            self.type_names.append(rel_type)
+        self.parents.append(parent)
+        self.children.append(child)
+        self.types.append(type_id)
+
+def build_adjacency(count, parents, children):
+    """CSR adjacency (offsets, targets) over count nodes for the distinct parent -> child pairs.
+
+    The children of node i are targets[offsets[i]:offsets[i + 1]], in ascending order, so an
+    edge's position (see edge_position) can index per-edge flags such as redundant_edges'.
+    """
+    codes = sorted({parent * count + child for parent, child in zip(parents, children)})
+    offsets = array('l', [0]) * (count + 1)
+    targets = array('l', (code % count for code in codes))
+    for code in codes:
+        offsets[code // count + 1] += 1
+    for node in range(count):
+        offsets[node + 1] += offsets[node]
+    return offsets, targets
+
+def reduce_relationships(count, relationships):
+    """Yield (parent, child, type, status) for each relationship, in order.
+
+    status is 'added' for the first occurrence of an edge that no other path makes redundant,
+    'redundant' for each occurrence of one that is, and 'duplicate' for repeats of an added edge.
+    """
+    offsets, targets = build_adjacency(count, relationships.parents, relationships.children)
+    redundant = redundant_edges(offsets, targets)
+    added = bytearray(len(targets))
+    for parent, child, rel_type in relationships:
+        edge = edge_position(offsets, targets, parent, child)
+        if added[edge]:
+            status = 'duplicate'
+        elif redundant[edge]:
+            status = 'redundant'
+        else:
+            added[edge] = 1
+            status = 'added'
+        yield parent, child, rel_type, status
+
+def edge_position(offsets, targets, parent, child):
+    """Index of the parent -> child edge in targets."""
+    return bisect_left(targets, child, offsets[parent], offsets[parent + 1])
+
+def strongly_connected_components(offsets, targets):
+    """Tarjan's algorithm over CSR adjacency, iteratively so deep graphs cannot hit the recursion limit.
+
+    Returns (component of each node, components); components come out sinks first, i.e. an
+    edge between two components always points to the lower-numbered one.
+    """
+    n = len(offsets) - 1
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    component_of = [-1] * n
+    components = []
+    stack = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])]
+        while work:
+            node, i = work[-1]
+            if i < offsets[node + 1]:
+                work[-1] = (node, i + 1)
+                child = targets[i]
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, offsets[child]))
+                elif on_stack[child]:
+                    low[node] = min(low[node], index[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component_of[member] = len(components)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return component_of, components
+
+def _flow_bridges(succ, pred):
+    """Edges (x, y) that every path from node 0 to y uses, in a graph where node 0 reaches every node.
+
+    Dominators come from Cooper, Harvey and Kennedy's iterative algorithm; (x, y) is such an
+    edge exactly when x is the only predecessor of y that can be reached without passing y.
+    """
+    n = len(succ)
+    order = []
+    seen = [False] * n
+    seen[0] = True
+    stack = [(0, iter(succ[0]))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if not seen[child]:
+                seen[child] = True
+                stack.append((child, iter(succ[child])))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+    order.reverse()
+    rank = [0] * n
+    for i, node in enumerate(order):
+        rank[node] = i
+
+    idom = [-1] * n
+    idom[0] = 0
+    changed = True
+    while changed:
+        changed = False
+        for node in order[1:]:
+            new = -1
+            for p in pred[node]:
+                if idom[p] == -1:
+                    continue
+                if new == -1:
+                    new = p
+                    continue
+                a, b = p, new
+                while a != b:
+                    while rank[a] > rank[b]:
+                        a = idom[a]
+                    while rank[b] > rank[a]:
+                        b = idom[b]
+                new = a
+            if idom[node] != new:
+                idom[node] = new
+                changed = True
+
+    # y dominates w exactly when w's dominator tree interval lies inside y's
+    tree = [[] for _ in range(n)]
+    for node in range(1, n):
+        tree[idom[node]].append(node)
+    enter = [0] * n
+    leave = [0] * n
+    clock = 0
+    stack = [(0, False)]
+    while stack:
+        node, done = stack.pop()
+        clock += 1
+        if done:
+            leave[node] = clock
+            continue
+        enter[node] = clock
+        stack.append((node, True))
+        stack.extend((child, False) for child in tree[node])
+
+    bridges = []
+    for node in range(1, n):
+        outside = [p for p in pred[node] if not enter[node] <= enter[p] <= leave[node]]
+        if len(outside) == 1:
+            bridges.append((outside[0], node))
+    return bridges
+
+def _strong_bridges(offsets, targets, members, component_of):
+    """The edges inside one strongly connected component whose removal would break it apart.
+
+    Those are exactly the edges with no other path from parent to child. An edge is one of them
+    when every path to its child from some fixed member, or every path from its parent back to
+    that member, has to use it, which takes two dominator computations instead of a search per edge.
+    """
+    local = {node: i for i, node in enumerate(members)}
+    component = component_of[members[0]]
+    forward = [[] for _ in members]
+    backward = [[] for _ in members]
+    for node in members:
+        for child in targets[offsets[node]:offsets[node + 1]]:
+            if child != node and component_of[child] == component:
+                forward[local[node]].append(local[child])
+                backward[local[child]].append(local[node])
+    bridges = set()
+    for x, y in _flow_bridges(forward, backward):
+        bridges.add((members[x], members[y]))
+    for y, x in _flow_bridges(backward, forward):
+        bridges.add((members[x], members[y]))
+    return bridges
+
+def redundant_edges(offsets, targets):
+    """Flag each CSR edge that another path from its parent to its child makes redundant.
+
+    Same answer as looking for a path around each edge (a self-loop is always redundant), without
+    enumerating paths: across strongly connected components an edge A -> B is redundant when another
+    edge also joins A to B, or when B is reachable from another successor of A, using reachability
+    bitsets built over the condensed DAG sinks first. Only components with two or more predecessors
+    get a bit, since nothing else can be reached two ways. Inside a component, an edge is redundant
+    unless it is a strong bridge.
+    """
+    n = len(offsets) - 1
+    component_of, components = strongly_connected_components(offsets, targets)
+
+    # condensed edges (keyed source * count + target), with how many original edges each one stands for
+    count = len(components)
+    crossings = defaultdict(int)
+    for node in range(n):
+        source = component_of[node]
+        for child in targets[offsets[node]:offsets[node + 1]]:
+            if source != component_of[child]:
+                crossings[source * count + component_of[child]] += 1
+    condensed = [[] for _ in components]
+    predecessors = array('l', [0]) * count
+    for code in crossings:
+        condensed[code // count].append(code % count)
+        predecessors[code % count] += 1
+
+    # bit positions, only for components with two or more predecessors
+    position = array('l', [-1]) * count
+    bits = 0
+    for c in range(count):
+        if predecessors[c] > 1:
+            position[c] = bits
+            bits += 1
+
+    # closure[c]: bits of everything reachable from c (not c itself), dropped once its last
+    # predecessor has used it; sinks have none
+    closure = {}
+    remaining = array('l', predecessors)
+    shortcut = set()
+    for c in range(count):
+        descendants = 0
+        indirect = 0
+        for target in condensed[c]:
+            reach = closure.get(target, 0)
+            indirect |= reach
+            descendants |= reach
+            if position[target] >= 0:
+                descendants |= 1 << position[target]
+            remaining[target] -= 1
+            if not remaining[target]:
+                closure.pop(target, None)
+        for target in condensed[c]:
+            if position[target] >= 0 and indirect >> position[target] & 1:
+                shortcut.add(c * count + target)
+        if predecessors[c] and descendants:
+            closure[c] = descendants
+
+    bridges = set()
+    for members in components:
+        if len(members) > 1:
+            bridges |= _strong_bridges(offsets, targets, members, component_of)
+    redundant = bytearray(len(targets))
+    for node in range(n):
+        source = component_of[node]
+        for edge in range(offsets[node], offsets[node + 1]):
+            child = targets[edge]
+            target = component_of[child]
+            if node == child:
+                found = True
+            elif source == target:
+                found = (node, child) not in bridges
+            else:
+                code = source * count + target
+                found = crossings[code] > 1 or code in shortcut
+            if found:
+                redundant[edge] = 1
+    return redundant
+
+def weak_components(nodes, edges):
+    """Split a graph into its weakly connected components, as (nodes, edges) copies.
+
+    Components are ordered by their first node, and keep their nodes and edges in the original
+    order, so an unchanged part of a graph is split out identically every time.
+    """
+    around = _neighbours(len(nodes), edges)
+    component_of = array('l', [-1]) * len(nodes)
+    parts = []
+    for start in range(len(nodes)):
+        if component_of[start] >= 0:
+            continue
+        component_of[start] = len(parts)
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other in around[node]:
+                if component_of[other] < 0:
+                    component_of[other] = len(parts)
+                    stack.append(other)
+        parts.append((NodeTable(), Relationships()))
+
+    new_id = array('l', [0]) * len(nodes)
+    for node in range(len(nodes)):
+        part = parts[component_of[node]][0]
+        new_id[node] = part.add(nodes.keys[node], nodes.kinds[node], nodes.names[node], nodes.labels[node],
+                                nodes.types[node])
+    for parent, child, rel_type in edges:
+        parts[component_of[parent]][1].add(new_id[parent], new_id[child], rel_type)
+    return parts
+
+
+# --- summaries: each takes the (nodes, edges) of a reduced graph and returns a smaller one ---
+
+def _project(nodes, edges, target, labels=None):
+    """Copy a graph keeping the nodes that target maps to themselves, in their original order.
+
+    target[node] is the node it is merged into (itself to keep it, -1 to drop it); labels can
+    override the labels of kept nodes. Edges follow their endpoints, those that become self-loops
+    or repeats are dropped, and the rest are reduced again since merging can make more redundant.
+    """
+    new_id = array('l', [-1]) * len(nodes)
+    projected = NodeTable()
+    for node in range(len(nodes)):
+        if target[node] == node:
+            label = labels.get(node, nodes.labels[node]) if labels else nodes.labels[node]
+            new_id[node] = projected.add(nodes.keys[node], nodes.kinds[node], nodes.names[node], label,
+                                         nodes.types[node])
+    for node in range(len(nodes)):
+        if target[node] >= 0:
+            new_id[node] = new_id[target[node]]
+
+    mapped = Relationships()
+    for parent, child, rel_type in edges:
+        parent, child = new_id[parent], new_id[child]
+        if parent >= 0 and child >= 0 and parent != child:
+            mapped.add(parent, child, rel_type)
+    reduced = Relationships()
+    for parent, child, rel_type, status in reduce_relationships(len(projected), mapped):
+        if status == 'added':
+            reduced.add(parent, child, rel_type)
+    return projected, reduced
+
+def _neighbours(count, edges):
+    """Undirected adjacency lists."""
+    around = [[] for _ in range(count)]
+    for parent, child in zip(edges.parents, edges.children):
+        around[parent].append(child)
+        around[child].append(parent)
+    return around
+
+def neighbourhood(nodes, edges, package, depth=2):
+    """Keep the packages named package (or name@version) and everything within depth edges of them."""
+    seeds = [node for node, key in enumerate(nodes.keys)
+             if nodes.kinds[node] == PACKAGE and package in (key[1], f"{key[1]}@{key[2]}")]
+    if not seeds:
+        raise ValueError(f"no package named {package!r} in the SBOM")
+    around = _neighbours(len(nodes), edges)
+    target = array('l', [-1]) * len(nodes)
+    frontier = seeds
+    for node in seeds:
+        target[node] = node
+    for _ in range(depth):
+        reached = []
+        for node in frontier:
+            for other in around[node]:
+                if target[other] < 0:
+                    target[other] = other
+                    reached.append(other)
+        frontier = reached
+    return _project(nodes, edges, target)
+
+def collapse_files(nodes, edges):
+    """Merge each file into the package that contains it; the package's label counts what it absorbed."""
+    target = array('l', range(len(nodes)))
+    for parent, child, rel_type in edges:
+        if (rel_type == 'contains' and nodes.kinds[child] == FILE and nodes.kinds[parent] == PACKAGE
+                and target[child] == child):
+            target[child] = parent
+    absorbed = defaultdict(int)
+    for node in range(len(nodes)):
+        if target[node] != node:
+            absorbed[target[node]] += 1
+    labels = {node: f"{nodes.labels[node]}\n(+{n} files)" for node, n in absorbed.items()}
+    return _project(nodes, edges, target, labels)
+
+def _roots(count, edges):
+    has_parent = bytearray(count)
+    for child in edges.children:
+        has_parent[child] = 1
+    return [node for node in range(count) if not has_parent[node]]
+
+def _reached(count, edges, start):
+    """Flags for the nodes reachable from start along edges."""
+    children = [[] for _ in range(count)]
+    for parent, child in zip(edges.parents, edges.children):
+        children[parent].append(child)
+    reached = bytearray(count)
+    stack = list(start)
+    while stack:
+        node = stack.pop()
+        if not reached[node]:
+            reached[node] = 1
+            stack.extend(children[node])
+    return reached
+
+def cap_children(nodes, edges, limit):
+    """Show at most limit children per node, replacing the rest with one "+N more" node.
+
+    Nodes that are then no longer reachable from a root are hidden along with the edges that led
+    to them (nodes that only sit on cycles are kept).
+    """
+    shown = array('l', [0]) * len(nodes)
+    hidden = defaultdict(int)
+    capped = Relationships()
+    for parent, child, rel_type in edges:
+        if shown[parent] < limit:
+            shown[parent] += 1
+            capped.add(parent, child, rel_type)
+        else:
+            hidden[parent] += 1
+
+    roots = _roots(len(nodes), edges)
+    visible = _reached(len(nodes), capped, roots)
+    rooted = _reached(len(nodes), edges, roots)
+    target = array('l', (node if visible[node] or not rooted[node] else -1 for node in range(len(nodes))))
+
+    projected, kept = _project(nodes, capped, target)
+    for parent, count in hidden.items():
+        if target[parent] != parent:
+            continue
+        new_parent = projected.lookup(nodes.keys[parent])
+        more = projected.add(('more', nodes.keys[parent]), SUMMARY, f"{nodes.names[parent]}_more",
+                             f"+{count} more")
+        kept.add(new_parent, more, 'more')
+    return projected, kept
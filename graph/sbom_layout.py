@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Lay out the components of a graph as separate Graphviz jobs, cache each layout and pack them into one drawing."""
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from graphviz import Source
+from sbom_graph import NodeTable, Relationships
+
+# bump when what is stored for a layout changes
+LAYOUT_FORMAT = 1
+# components smaller than this are laid out together, SMALL_BUCKETS jobs' worth, instead of one job each
+SMALL_COMPONENT = 20
+SMALL_BUCKETS = 16
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'elf-notes', 'layouts')
+
+def can_pack():
+    """Whether the Graphviz tools that merge positioned graphs are installed."""
+    return shutil.which('gvpack') is not None and shutil.which('neato') is not None
+
+def _merge(parts):
+    """One (nodes, edges) graph holding several disjoint ones."""
+    nodes = NodeTable()
+    edges = Relationships()
+    for part_nodes, part_edges in parts:
+        offset = len(nodes)
+        for node in range(len(part_nodes)):
+            nodes.add(part_nodes.keys[node], part_nodes.kinds[node], part_nodes.names[node],
+                      part_nodes.labels[node], part_nodes.types[node])
+        for parent, child, rel_type in part_edges:
+            edges.add(parent + offset, child + offset, rel_type)
+    return nodes, edges
+
+def _digest(source):
+    return hashlib.sha256(f"{LAYOUT_FORMAT}\n{source}".encode('utf-8')).hexdigest()
+
+def _layout(source):
+    """Run dot on one job's source and return it with node and edge positions filled in."""
+    return Source(source).pipe(format='dot').decode('utf-8')
+
+def layout_sources(parts, to_digraph):
+    """The DOT source of each layout job: one per large component, small ones bucketed by their content.
+
+    A small component lands in the same bucket whatever else is in the graph, so changing one only
+    invalidates the layout of its own bucket.
+    """
+    sources = []
+    buckets = [[] for _ in range(SMALL_BUCKETS)]
+    for nodes, edges in parts:
+        source = to_digraph(nodes, edges).source
+        if len(nodes) >= SMALL_COMPONENT:
+            sources.append(source)
+        else:
+            buckets[int(_digest(source)[:8], 16) % SMALL_BUCKETS].append((nodes, edges))
+    for bucket in buckets:
+        if bucket:
+            sources.append(to_digraph(*_merge(bucket)).source)
+    return sources
+
+def layout_all(sources, jobs=None, cache_dir=None):
+    """Positioned DOT for every source, reading unchanged ones from cache_dir; returns (layouts, reused)."""
+    layouts = [None] * len(sources)
+    paths = [os.path.join(cache_dir, f"{_digest(source)}.gv") if cache_dir else None for source in sources]
+    missing = []
+    for i, path in enumerate(paths):
+        if path is not None:
+            try:
+                with open(path, 'r') as f:
+                    layouts[i] = f.read()
+                continue
+            except OSError:
+                pass
+        missing.append(i)
+
+    if len(missing) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            computed = list(pool.map(_layout, [sources[i] for i in missing]))
+    else:
+        computed = [_layout(sources[i]) for i in missing]
+
+    if cache_dir and missing:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Warning: not caching layouts, unable to create {cache_dir}: {e}", file=sys.stderr)
+            cache_dir = None
+    for i, layout in zip(missing, computed):
+        layouts[i] = layout
+        if not cache_dir:
+            continue
+        tmp_path = f"{paths[i]}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(layout)
+            os.replace(tmp_path, paths[i])
+        except OSError as e:
+            print(f"Warning: not caching layouts, unable to write {paths[i]}: {e}", file=sys.stderr)
+            cache_dir = None
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+    return layouts, len(sources) - len(missing)
+
+def render_packed(parts, to_digraph, output_path, output_format, jobs=None, cache_dir=None):
+    """Draw the components of a graph into one file: each is laid out on its own, then gvpack
+    arranges the positioned pieces and neato -n2 draws them without moving any node."""
+    sources = layout_sources(parts, to_digraph)
+    layouts, reused = layout_all(sources, jobs, cache_dir)
+    print(f"Laid out {len(parts)} components in {len(sources)} jobs ({reused} reused from cache)")
+
+    packed = subprocess.run(['gvpack', '-array'], input=''.join(layouts), capture_output=True, text=True,
+                            check=True).stdout
+    subprocess.run(['neato', '-n2', f"-T{output_format}", '-o', output_path], input=packed, capture_output=True,
+                   text=True, check=True)
+    return output_path
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Read the parts of a syft JSON SBOM the graph scripts use, without loading the whole document."""
+import json
+import re
+
+READ_CHUNK = 1024 * 1024
+# the only whitespace JSON allows between tokens
+WHITESPACE_CHARS = ' \t\n\r'
+WHITESPACE = re.compile(f"[{re.escape(WHITESPACE_CHARS)}]*")
+
+# the top-level arrays that are kept, and how each element is trimmed down
+SECTIONS = {
+    'artifacts': lambda item: {
+        'id': item.get('id', ''),
+        'name': item.get('name', ''),
+        'version': item.get('version', ''),
+        'type': item.get('type', ''),
+    },
+    'files': lambda item: {
+        'id': item.get('id', ''),
+        'location': {'path': item.get('location', {}).get('path', '')},
+        'type': item.get('type', ''),
+    },
+    'artifactRelationships': lambda item: {
+        'parent': item.get('parent', ''),
+        'child': item.get('child', ''),
+        'type': item.get('type', ''),
+    },
+}
+
+class _Reader:
+    """A text buffer over a file that only holds what has not been parsed yet (plus one read)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.pos > READ_CHUNK:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        # read at least as much as is buffered, so a large value is not re-parsed once per chunk
+        chunk = self.f.read(max(READ_CHUNK, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+        self.buffer += chunk
+
+    def peek(self):
+        """The next non-whitespace character ('' at the end of the file)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r} at offset {self.pos}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        if self.pos >= len(self.buffer) or self.buffer[self.pos] in WHITESPACE_CHARS:
+            self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # a number near the end of the buffer may continue in the next read: raw_decode stops
+            # before a trailing '.', 'e' or 'e+' whose digits have not been read yet
+            if not self.eof and (end == len(self.buffer)
+                                 or isinstance(value, (int, float)) and len(self.buffer) - end <= 2):
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+def iter_sbom(f, sections=SECTIONS):
+    """Yield (section, element) for each element of the wanted top-level arrays, as they are read."""
+    reader = _Reader(f)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key in sections and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield key, reader.value()
+                    if reader.expect(',]') == ']':
+                        break
+            else:
+                reader.expect(']')
+        else:
+            # other sections (source, distro, descriptor, schema) are small and unused
+            reader.value()
+        if reader.expect(',}') == '}':
+            return
+
+def read_sbom(filepath):
+    """Load an SBOM as a dict holding only trimmed artifacts, files and relationships.
+
+    Elements are decoded one at a time and trimmed straight away, so peak memory follows the size
+    of the graph rather than of the document (full-image SBOMs are mostly package metadata).
+    """
+    sbom = {section: [] for section in SECTIONS}
+    with open(filepath, 'r') as f:
+        for section, item in iter_sbom(f):
+            sbom[section].append(SECTIONS[section](item))
+    return sbom
@@ -1,14 +1,13 @@
 #!/usr/bin/env python3
-import json
 import sys
 import webbrowser
 import os
 from graphviz import Digraph
+from sbom_stream import read_sbom
 
 def load_sbom(filepath):
-    """Load and parse SBOM JSON file."""
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    """Load the artifacts, files and relationships of an SBOM JSON file, streaming it."""
+    return read_sbom(filepath)
 
 def create_node_id(prefix, item):
     """Create a unique node ID based on the item type and properties."""
@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
-import json
+import argparse
+import contextlib
 import sys
 import webbrowser
 import os
 from graphviz import Digraph
-from collections import defaultdict
+from sbom_export import WRITERS
+from sbom_graph import (FILE, PACKAGE, SUMMARY, NodeTable, Relationships, cap_children, collapse_files,
+                        neighbourhood, reduce_relationships, weak_components)
+from sbom_layout import can_pack, default_cache_dir, render_packed
+from sbom_stream import read_sbom
 
 def load_sbom(filepath):
-    """Load and parse SBOM JSON file."""
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    """Load the artifacts, files and relationships of an SBOM JSON file, streaming it."""
+    return read_sbom(filepath)
+
+def read_graph(filepath, reduce=True, verbose=False):
+    """load_sbom and build_graph for tools with their own output: the build log goes to stderr or nowhere."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stderr if verbose else devnull):
+        return build_graph(load_sbom(filepath), reduce)
 
 def get_node_key(prefix, item):
     """Generate a unique key for deduplication."""
@@ -34,61 +43,29 @@ def create_node_id(prefix, item):
         print(f"  From path: {path}")
         return node_id
 
-def find_all_paths(graph, start, end, path=None):
-    """Find all paths between two nodes in the graph."""
-    if path is None:
-        path = []
-    path = path + [start]
-    if start == end:
-        return [path]
-    if start not in graph:
-        return []
-    paths = []
-    for node in graph[start]:
-        if node not in path:
-            newpaths = find_all_paths(graph, node, end, path)
-            for newpath in newpaths:
-                paths.append(newpath)
-    return paths
-
-def is_redundant_edge(graph, parent, child):
-    """Check if there's already a path between parent and child without this edge."""
-    if child in graph[parent]:
-        graph[parent].remove(child)
-    paths = find_all_paths(graph, parent, child)
-    graph[parent].add(child)
-    return len(paths) > 0
+def build_graph(sbom_data, reduce=True):
+    """Deduplicate an SBOM's packages and files and drop redundant relationships.
 
-def create_graph(sbom_data):
-    """Create a directed graph from SBOM data."""
+    Returns (nodes, edges): the NodeTable and the kept Relationships, in SBOM order. With
+    reduce=False every relationship between known nodes is returned, redundant or not.
+    """
     print("\n=== Starting Graph Creation ===")
 
-    dot = Digraph(comment='SBOM Visualization')
-    dot.attr(rankdir='LR')
-    dot.attr('node', fontname='Arial')
-
-    # Create mappings for deduplication
-    node_keys = {}  # Maps original IDs to node keys
-    unique_nodes = {}  # Maps node keys to node IDs
-    id_to_node = {}  # Maps original IDs to final node IDs
+    # Nodes are deduplicated by key into dense integer ids
+    nodes = NodeTable()
+    id_to_node = {}  # Maps original IDs to node ids
 
     print("\n--- Processing Package Nodes ---")
     duplicate_count = 0
     for artifact in sbom_data.get('artifacts', []):
         orig_id = artifact.get('id', '')
         node_key = get_node_key('pkg', artifact)
-        node_keys[orig_id] = node_key
+        node = nodes.lookup(node_key)
 
-        if node_key not in unique_nodes:
+        if node is None:
             node_id = create_node_id('pkg', artifact)
-            unique_nodes[node_key] = node_id
-
             label = f"{artifact.get('name', '')}\n{artifact.get('version', '')}"
-            dot.node(node_id, label,
-                    shape='box',
-                    style='filled',
-                    fillcolor='lightblue',
-                    tooltip=f"Type: {artifact.get('type', '')}")
+            node = nodes.add(node_key, PACKAGE, node_id, label, artifact.get('type', ''))
             print(f"\nCreated new node:")
             print(f"  ID: {orig_id}")
             print(f"  Node ID: {node_id}")
@@ -96,13 +73,13 @@ def create_graph(sbom_data):
             duplicate_count += 1
             print(f"\nFound duplicate package:")
             print(f"  ID: {orig_id}")
-            print(f"  Using existing node: {unique_nodes[node_key]}")
+            print(f"  Using existing node: {nodes.names[node]}")
 
-        id_to_node[orig_id] = unique_nodes[node_key]
+        id_to_node[orig_id] = node
 
     print(f"\nPackage deduplication summary:")
     print(f"  Total packages: {len(sbom_data.get('artifacts', []))}")
-    print(f"  Unique packages: {len([k for k in unique_nodes.keys() if k[0] == 'pkg'])}")
+    print(f"  Unique packages: {nodes.count(PACKAGE)}")
     print(f"  Duplicates removed: {duplicate_count}")
 
     print("\n--- Processing File Nodes ---")
@@ -110,18 +87,12 @@ def create_graph(sbom_data):
     for file in sbom_data.get('files', []):
         orig_id = file.get('id', '')
         node_key = get_node_key('file', file)
-        node_keys[orig_id] = node_key
+        node = nodes.lookup(node_key)
 
-        if node_key not in unique_nodes:
+        if node is None:
             node_id = create_node_id('file', file)
-            unique_nodes[node_key] = node_id
-
             label = file.get('location', {}).get('path', '')
-            dot.node(node_id, label,
-                    shape='ellipse',
-                    style='filled',
-                    fillcolor='lightgreen',
-                    tooltip=f"Type: {file.get('type', '')}")
+            node = nodes.add(node_key, FILE, node_id, label, file.get('type', ''))
             print(f"\nCreated new node:")
             print(f"  ID: {orig_id}")
             print(f"  Node ID: {node_id}")
@@ -129,18 +100,17 @@ def create_graph(sbom_data):
             duplicate_count += 1
             print(f"\nFound duplicate file:")
             print(f"  ID: {orig_id}")
-            print(f"  Using existing node: {unique_nodes[node_key]}")
+            print(f"  Using existing node: {nodes.names[node]}")
 
-        id_to_node[orig_id] = unique_nodes[node_key]
+        id_to_node[orig_id] = node
 
     print(f"\nFile deduplication summary:")
     print(f"  Total files: {len(sbom_data.get('files', []))}")
-    print(f"  Unique files: {len([k for k in unique_nodes.keys() if k[0] == 'file'])}")
+    print(f"  Unique files: {nodes.count(FILE)}")
     print(f"  Duplicates removed: {duplicate_count}")
 
     print("\n--- Processing Relationships ---")
-    graph = defaultdict(set)
-    relationships = []
+    relationships = Relationships()
 
     for rel in sbom_data.get('artifactRelationships', []):
         parent_id = rel.get('parent', '')
@@ -148,63 +118,140 @@ def create_graph(sbom_data):
         rel_type = rel.get('type', '')
 
         if parent_id in id_to_node and child_id in id_to_node:
-            parent_node = id_to_node[parent_id]
-            child_node = id_to_node[child_id]
-            relationships.append((parent_node, child_node, rel_type))
-            graph[parent_node].add(child_node)
+            relationships.add(id_to_node[parent_id], id_to_node[child_id], rel_type)
+
+    if not reduce:
+        print(f"\nRelationship summary:")
+        print(f"  Total relationships: {len(relationships)}")
+        return nodes, relationships
 
     print("\n--- Creating Non-redundant Edges ---")
-    added_edges = set()
-    for parent_node, child_node, rel_type in relationships:
-        edge = (parent_node, child_node)
-        if edge not in added_edges:
-            if not is_redundant_edge(graph, parent_node, child_node):
-                print(f"\nAdding edge:")
-                print(f"  From: {parent_node}")
-                print(f"  To: {child_node}")
-                print(f"  Type: {rel_type}")
-
-                dot.edge(parent_node, child_node,
-                        label=rel_type,
-                        tooltip=rel_type,
-                        color='gray')
-                added_edges.add(edge)
-            else:
-                print(f"\nSkipping redundant edge:")
-                print(f"  From: {parent_node}")
-                print(f"  To: {child_node}")
-                print(f"  Type: {rel_type}")
+    edges = Relationships()
+    names = nodes.names
+    for parent, child, rel_type, status in reduce_relationships(len(nodes), relationships):
+        if status == 'added':
+            print(f"\nAdding edge:")
+            edges.add(parent, child, rel_type)
+        elif status == 'redundant':
+            print(f"\nSkipping redundant edge:")
+        else:
+            continue
+        print(f"  From: {names[parent]}")
+        print(f"  To: {names[child]}")
+        print(f"  Type: {rel_type}")
 
     print(f"\nRelationship summary:")
     print(f"  Total relationships: {len(relationships)}")
-    print(f"  Non-redundant edges: {len(added_edges)}")
+    print(f"  Non-redundant edges: {len(edges)}")
     print("\n=== Graph Creation Complete ===")
+    return nodes, edges
+
+NODE_STYLES = {
+    PACKAGE: {'shape': 'box', 'style': 'filled', 'fillcolor': 'lightblue'},
+    FILE: {'shape': 'ellipse', 'style': 'filled', 'fillcolor': 'lightgreen'},
+    SUMMARY: {'shape': 'plaintext', 'fontcolor': 'gray'},
+}
+
+def to_digraph(nodes, edges):
+    """Graphviz rendering of a reduced graph."""
+    dot = Digraph(comment='SBOM Visualization')
+    dot.attr(rankdir='LR')
+    dot.attr('node', fontname='Arial')
+
+    names = nodes.names
+    for node in range(len(nodes)):
+        dot.node(names[node], nodes.labels[node],
+                tooltip=f"Type: {nodes.types[node]}",
+                **NODE_STYLES[nodes.kinds[node]])
+    for parent, child, rel_type in edges:
+        dot.edge(names[parent], names[child],
+                label=rel_type,
+                tooltip=rel_type,
+                color='gray')
     return dot
 
+def render_graph(nodes, edges, output_path, output_format, jobs=None, cache_dir=None):
+    """Draw with Graphviz, laying out each weakly connected component as its own cached, parallel
+    job when the pieces can be packed back together (gvpack), and the whole graph at once otherwise."""
+    if can_pack():
+        parts = weak_components(nodes, edges)
+        if len(parts) > 1:
+            return render_packed(parts, to_digraph, output_path, output_format, jobs, cache_dir)
+    rendered = to_digraph(nodes, edges).render(os.path.splitext(output_path)[0], format=output_format, cleanup=True)
+    if rendered != output_path:
+        os.replace(rendered, output_path)
+    return output_path
+
+def create_graph(sbom_data):
+    """Create a directed graph from SBOM data."""
+    return to_digraph(*build_graph(sbom_data))
+
+def summarize(nodes, edges, args):
+    """Apply the --focus, --collapse-files and --max-children options, in that order."""
+    if args.focus:
+        nodes, edges = neighbourhood(nodes, edges, args.focus, args.depth)
+    if args.collapse_files:
+        nodes, edges = collapse_files(nodes, edges)
+    if args.max_children:
+        nodes, edges = cap_children(nodes, edges, args.max_children)
+    if args.focus or args.collapse_files or args.max_children:
+        print(f"\nSummarized to {len(nodes)} nodes and {len(edges)} edges")
+    return nodes, edges
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Visualize the package and file relationships in a syft JSON SBOM')
+    parser.add_argument('sbom_file', help='syft JSON SBOM')
+    parser.add_argument('--format', choices=['png', 'svg'] + sorted(WRITERS), default='png',
+                        help='png/svg are laid out by Graphviz; graphml, json (node-link) and html (a viewer that '
+                             'expands subtrees on click) are written directly and suit large graphs (default: png)')
+    parser.add_argument('--output', help='output file (default: <sbom>_sbom_viz.<format>)')
+    parser.add_argument('--no-open', action='store_true',
+                        help='do not open the result in a browser (never done when $CI is set)')
+    parser.add_argument('--focus', metavar='PACKAGE',
+                        help='only show the neighbourhood of this package (name or name@version)')
+    parser.add_argument('--depth', type=int, default=2, help='edges to follow from the --focus package (default: 2)')
+    parser.add_argument('--collapse-files', action='store_true', help='fold files into the package that contains them')
+    parser.add_argument('--max-children', type=int, metavar='N',
+                        help='show at most N children per node, summarizing the rest as "+N more"')
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help='Graphviz layouts to run at once for png/svg (default: one per CPU)')
+    parser.add_argument('--layout-cache', metavar='DIR', default=default_cache_dir(),
+                        help='where component layouts are kept between runs (default: %(default)s)')
+    parser.add_argument('--no-layout-cache', dest='layout_cache', action='store_const', const=None,
+                        help='lay out every component again')
+    return parser.parse_args()
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python sbom_visualizer.py <sbom_json_file>")
-        sys.exit(1)
+    args = parse_args()
 
-    sbom_file = sys.argv[1]
+    sbom_file = args.sbom_file
     try:
         print(f"\nProcessing SBOM file: {sbom_file}")
 
         sbom_data = load_sbom(sbom_file)
         print("SBOM file loaded successfully")
 
-        dot = create_graph(sbom_data)
+        nodes, edges = summarize(*build_graph(sbom_data), args)
 
-        output_base = os.path.splitext(os.path.abspath(sbom_file))[0]
-        png_path = output_base + '_sbom_viz.png'
+        output_base = os.path.splitext(os.path.abspath(sbom_file))[0] + '_sbom_viz'
+        output_path = os.path.abspath(args.output) if args.output else f"{output_base}.{args.format}"
 
         print(f"\nGenerating visualization...")
-        dot.render(output_base + '_sbom_viz', format='png', cleanup=True)
+        if args.format in WRITERS:
+            with open(output_path, 'w') as f:
+                if args.format == 'html':
+                    WRITERS['html'](nodes, edges, f, title=os.path.basename(sbom_file))
+                else:
+                    WRITERS[args.format](nodes, edges, f)
+        else:
+            render_graph(nodes, edges, output_path, args.format, args.jobs, args.layout_cache)
 
         print(f"\nGenerated visualization file:")
-        print(f"- {png_path}")
+        print(f"- {output_path}")
 
-        webbrowser.open('file://' + png_path)
+        if args.format in ('png', 'svg', 'html') and not args.no_open and not os.environ.get('CI'):
+            webbrowser.open('file://' + output_path)
 
     except Exception as e:
         print(f"\nError processing SBOM file: {e}")
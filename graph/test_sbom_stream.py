@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Run with: python3 -m unittest test_sbom_stream (from graph/)."""
+import io
+import json
+import unittest
+from unittest import mock
+
+import sbom_stream
+
+SBOM = {
+    'descriptor': {'name': 'syft', 'score': 2.5, 'ratio': 1e5, 'delta': -12.25e+3},
+    'artifacts': [
+        {'id': 'a1', 'name': 'openssl', 'version': '3.0.2', 'type': 'deb', 'size': 1.5E-3},
+        {'id': 'a2', 'name': 'curl', 'version': '7.81.0', 'type': 'deb', 'weight': 0.125},
+    ],
+    'files': [{'id': 'f1', 'location': {'path': '/usr/bin/curl'}, 'type': 'elf'}],
+    'artifactRelationships': [{'parent': 'a2', 'child': 'f1', 'type': 'contains'}],
+    'schema': 7.5,
+}
+
+class IterSbomTest(unittest.TestCase):
+
+    def test_values_split_at_every_read_boundary(self):
+        document = json.dumps(SBOM)
+        expected = [(section, item) for section in sbom_stream.SECTIONS for item in SBOM[section]]
+        for chunk in range(1, 12):
+            for padding in range(chunk):
+                with self.subTest(chunk=chunk, padding=padding), mock.patch.object(sbom_stream, 'READ_CHUNK', chunk):
+                    self.assertEqual(list(sbom_stream.iter_sbom(io.StringIO(' ' * padding + document))), expected)
+
+    def test_bare_numbers_split_after_point_or_exponent(self):
+        document = '{"artifacts": [2.5, 1E-3, 10, -7.25e+2], "schema": 2.5}'
+        for padding in range(16):
+            with self.subTest(padding=padding), mock.patch.object(sbom_stream, 'READ_CHUNK', 8):
+                items = [item for _, item in sbom_stream.iter_sbom(io.StringIO(' ' * padding + document))]
+                self.assertEqual(items, [2.5, 1e-3, 10, -725.0])
+
+if __name__ == '__main__':
+    unittest.main()